@@ -1,68 +1,222 @@
 import os
+import re
+import json
+import time
+import hashlib
+import threading
 import traceback
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from dotenv import load_dotenv
+import metrics
+from cache import TTLCache
 
 # Load Environment Variables
 load_dotenv()
 
-# Initialize Gemini
-# If this fails, make sure GOOGLE_API_KEY is in your .env file
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash", 
-    temperature=0.5,
-    google_api_key=os.getenv("GOOGLE_API_KEY")
+# --- Response cache ---
+AI_CACHE_ENABLED = os.getenv("AI_CACHE_ENABLED", "true").lower() == "true"
+AI_CACHE_TTL = float(os.getenv("AI_CACHE_TTL", "21600"))   # Seconds an answer is reused (6h)
+AI_CACHE_SIZE = int(os.getenv("AI_CACHE_SIZE", "1024"))    # Max answers kept
+AI_CACHE_FLUSH_DELAY = float(os.getenv("AI_CACHE_FLUSH_DELAY", "30"))  # Seconds new answers wait before the file is rewritten
+AI_CACHE_PATH = os.getenv("AI_CACHE_PATH", os.path.join(os.path.dirname(__file__), "data", "ai_cache.json"))
+
+# --- Model ---
+# "fake" swaps Gemini for a local canned model that streams a fixed answer
+# character by character: no API key, no tokens spent (tests, load runs)
+AI_PROVIDER = os.getenv("AI_PROVIDER", "gemini").lower()
+AI_FAKE_RESPONSE = os.getenv("AI_FAKE_RESPONSE", "This is a test answer from the fake advisor.")
+AI_FAKE_DELAY = float(os.getenv("AI_FAKE_DELAY", "0.01"))  # Seconds between streamed characters
+
+def build_llm():
+    if AI_PROVIDER == "fake":
+        from langchain_core.language_models.fake_chat_models import FakeListChatModel
+        return FakeListChatModel(responses=[AI_FAKE_RESPONSE], sleep=AI_FAKE_DELAY)
+
+    # Initialize Gemini
+    # If this fails, make sure GOOGLE_API_KEY is in your .env file
+    return ChatGoogleGenerativeAI(
+        model="gemini-2.5-flash", 
+        temperature=0.5,
+        google_api_key=os.getenv("GOOGLE_API_KEY")
+    )
+
+llm = build_llm()
+
+# --- Prompt + Chain (built once, shared by every request) ---
+template = """
+You are an expert AI Financial Advisor. 
+You are speaking to {name}.
+
+Here is their financial snapshot:
+- Monthly Income: ₹{income}
+- Risk Tolerance: {risk}
+- Recent Transactions: {transactions}
+- Current Assets (Portfolio): {assets}
+
+User Question: "{question}"
+
+Analyze their finances and give a helpful, data-driven answer. 
+Keep it concise, friendly, and structured.
+"""
+
+prompt = PromptTemplate(
+    input_variables=["name", "income", "risk", "transactions", "assets", "question"],
+    template=template
 )
 
-def ask_ai_advisor(user_profile, financial_data, user_question):
+# Ensure StrOutputParser has parentheses () at the end!
+chain = prompt | llm | StrOutputParser()
+
+def build_inputs(user_profile, financial_data, user_question):
+    return {
+        "name": user_profile['name'],
+        "income": user_profile['income'],
+        "risk": user_profile['risk'],
+        "transactions": financial_data['transactions'],
+        "assets": financial_data['assets'],
+        "question": user_question
+    }
+
+# Answers are keyed on the normalized question plus a hash of everything else
+# in the prompt (profile, transactions, assets), so a new transaction or
+# asset changes the key and the old answer is simply never hit again.
+CONTEXT_FIELDS = ["name", "income", "risk", "transactions", "assets"]
+
+response_cache = TTLCache(AI_CACHE_TTL, AI_CACHE_SIZE, name="ai_responses")
+_cache_file_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_flush_timer = None  # Pending flush, if any
+
+def normalize_question(question):
+    # Case, punctuation and spacing do not change the answer
+    return " ".join(re.findall(r"\w+", question.lower()))
+
+def cache_key(inputs):
+    context = json.dumps({field: inputs[field] for field in CONTEXT_FIELDS}, sort_keys=True, default=str)
+    fingerprint = hashlib.sha256(context.encode()).hexdigest()
+    return f"{fingerprint}:{normalize_question(inputs['question'])}"
+
+def load_response_cache():
+    try:
+        with open(AI_CACHE_PATH) as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return
+    except (OSError, ValueError) as e:
+        print(f"AI cache: could not read {AI_CACHE_PATH}: {e}")
+        return
+
+    elapsed = time.time() - data.get("saved_at", 0)
+    for key, value, remaining in data.get("entries", []):
+        if remaining is None:
+            response_cache.set(key, value)
+        elif remaining - elapsed > 0:
+            response_cache.set(key, value, ttl=remaining - elapsed)
+
+def save_response_cache():
+    """
+    Writes the live entries to AI_CACHE_PATH (write-then-rename).
+    """
+    with _cache_file_lock:
+        try:
+            os.makedirs(os.path.dirname(AI_CACHE_PATH) or ".", exist_ok=True)
+            tmp_path = AI_CACHE_PATH + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"saved_at": time.time(), "entries": response_cache.snapshot()}, f)
+            os.replace(tmp_path, AI_CACHE_PATH)
+        except OSError as e:
+            print(f"AI cache: could not write {AI_CACHE_PATH}: {e}")
+
+def flush_response_cache():
     """
-    Sends user data + question to Gemini and gets a response.
+    Writes the cache to disk if answers were added since the last write.
+    Runs on the flush timer and at shutdown.
     """
+    global _flush_timer
+    with _flush_lock:
+        pending, _flush_timer = _flush_timer, None
+    if pending is not None:
+        pending.cancel()
+        save_response_cache()
+
+def lookup_response(inputs):
+    """
+    (cache key, cached answer or None) for a prompt's inputs.
+    """
+    key = cache_key(inputs)
+    return key, (response_cache.get(key) if AI_CACHE_ENABLED else None)
+
+def remember_response(key, response):
+    """
+    Caches a (non-empty) answer. The file is rewritten at most once per
+    AI_CACHE_FLUSH_DELAY, on a timer thread, however many answers arrive.
+    """
+    global _flush_timer
+    if not AI_CACHE_ENABLED or not response:
+        return
+    response_cache.set(key, response)
+    with _flush_lock:
+        if _flush_timer is None:
+            _flush_timer = threading.Timer(AI_CACHE_FLUSH_DELAY, flush_response_cache)
+            _flush_timer.daemon = True
+            _flush_timer.start()
+
+if AI_CACHE_ENABLED:
+    load_response_cache()
+
+async def ask_ai_advisor_async(user_profile, financial_data, user_question):
+    """
+    Sends user data + question to Gemini and awaits the response.
+    Repeated questions on unchanged data are answered from the cache.
+    """
+    inputs = build_inputs(user_profile, financial_data, user_question)
+    key, cached = lookup_response(inputs)
+    if cached is not None:
+        return cached
+
     print("--- [AI DEBUG] Connecting to Gemini... ---")
-    
+
     try:
-        # 1. Create the Prompt Template
-        template = """
-        You are an expert AI Financial Advisor. 
-        You are speaking to {name}.
-        
-        Here is their financial snapshot:
-        - Monthly Income: ₹{income}
-        - Risk Tolerance: {risk}
-        - Recent Transactions: {transactions}
-        - Current Assets (Portfolio): {assets}
-        
-        User Question: "{question}"
-        
-        Analyze their finances and give a helpful, data-driven answer. 
-        Keep it concise, friendly, and structured.
-        """
-        
-        prompt = PromptTemplate(
-            input_variables=["name", "income", "risk", "transactions", "assets", "question"],
-            template=template
-        )
-        
-        # 2. Define the Chain
-        # Ensure StrOutputParser has parentheses () at the end!
-        chain = prompt | llm | StrOutputParser()
-        
-        # 3. Run the Chain
-        response = chain.invoke({
-            "name": user_profile['name'],
-            "income": user_profile['income'],
-            "risk": user_profile['risk'],
-            "transactions": financial_data['transactions'],
-            "assets": financial_data['assets'],
-            "question": user_question
-        })
-        
+        with metrics.timed("llm", AI_PROVIDER):
+            response = await chain.ainvoke(inputs)
+
         print("--- [AI DEBUG] Success! ---")
+        remember_response(key, response)
         return response
 
     except Exception as e:
         print("!!! AI ERROR !!!")
         traceback.print_exc() # This prints the full error to your terminal
-        raise e
\ No newline at end of file
+        raise e
+
+async def stream_ai_advisor(user_profile, financial_data, user_question):
+    """
+    Async generator over the answer's text chunks as the model produces
+    them (chain.astream). A cached answer is yielded as a single chunk.
+    """
+    inputs = build_inputs(user_profile, financial_data, user_question)
+    key, cached = lookup_response(inputs)
+    if cached is not None:
+        yield cached
+        return
+
+    parts = []
+    start = time.perf_counter()
+    try:
+        with metrics.timed("llm", AI_PROVIDER):
+            async for chunk in chain.astream(inputs):
+                if not chunk:
+                    continue
+                if not parts:
+                    metrics.record("llm_first_token", time.perf_counter() - start, AI_PROVIDER)
+                parts.append(chunk)
+                yield chunk
+    except Exception:
+        print("!!! AI ERROR !!!")
+        traceback.print_exc() # This prints the full error to your terminal
+        raise
+
+    # Only a complete answer is cached (not one cut short by a disconnect)
+    remember_response(key, "".join(parts))
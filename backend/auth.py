@@ -1,11 +1,12 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from jose import jwt, JWTError
 import os
-import crud, database, schemas
+import crud_async, database, schemas, metrics
+from cache import TTLCache
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -16,6 +17,12 @@ SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
+# Resolved users, keyed by id. Profile updates in this process invalidate
+# the entry; other worker processes pick them up once the TTL runs out.
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "4096"))
+user_cache = TTLCache(USER_CACHE_TTL, maxsize=USER_CACHE_SIZE, name="users")
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def verify_password(plain_password, hashed_password):
@@ -30,21 +37,54 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+def create_user_token(user):
+    """
+    Token for a logged-in user. Carries the immutable identity (id + email);
+    profile fields stay out so that an update takes effect without a new login.
+    """
+    return create_access_token(data={"sub": user.email, "uid": user.id})
+
+class AuthenticatedUser:
+    """
+    Plain snapshot of the User columns the endpoints read. Safe to share
+    between requests, unlike an ORM instance bound to one session.
+    """
+    __slots__ = ("id", "email", "full_name", "risk_tolerance", "monthly_income", "financial_goal")
+
+    def __init__(self, user):
+        for field in self.__slots__:
+            setattr(self, field, getattr(user, field))
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(database.get_async_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
+    with metrics.timed("auth"):
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            email: str = payload.get("sub")
+            user_id = payload.get("uid")
+            if email is None:
+                raise credentials_exception
+        except JWTError:
             raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    
-    user = crud.get_user_by_email(db, email=email)
+
+        if user_id is not None:
+            user = user_cache.get(user_id)
+            if user is None:
+                db_user = await crud_async.get_user(db, user_id)
+                user = AuthenticatedUser(db_user) if db_user else None
+                if user is not None:
+                    user_cache.set(user_id, user)
+            # The id must still belong to the account the token was issued for
+            if user is not None and user.email != email:
+                user = None
+        else:
+            # Tokens issued before ids were included: one lookup by email
+            db_user = await crud_async.get_user_by_email(db, email=email)
+            user = AuthenticatedUser(db_user) if db_user else None
     if user is None:
         raise credentials_exception
     return user
\ No newline at end of file
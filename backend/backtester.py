@@ -0,0 +1,251 @@
+"""
+Walk-forward backtester for the predict_intraday signal rules.
+
+Replays the same pipeline over stored history -- indicators, linear model
+on [Close, RSI, EMA_9, EMA_21, Volatility] predicting the next close, the
+RSI overbought/oversold filter and the ATR-based target / stop-loss -- for
+every bar of every symbol at once. The model is refit every `refit_every`
+bars on the same trailing window predict_intraday fits on for the period
+(22 bars for 1mo, 252 for 1yr, ...), using only bars known at the time.
+
+Indicators are computed once over the whole stored history, so EMA_9 and
+EMA_21 are seeded at its start rather than at each window's start as in
+period_indicators(); the two agree once the EMAs have warmed up.
+
+Historical fundamentals are not available, so the analyst score is taken
+as neutral (no STRONG BUY / WEAK BUY upgrades, which do not change the
+target or stop-loss anyway).
+"""
+
+import numpy as np
+
+import indicators
+import ml_engine
+from regression import RecursiveLeastSquares, fit_least_squares
+
+FEATURES = ["Close", "RSI", "EMA_9", "EMA_21", "Volatility"]
+PRICE_FEATURES = {"Close", "EMA_9", "EMA_21", "Volatility"}
+MIN_TRAINING_ROWS = 2           # Same minimum as predict_intraday
+RSI_WARMUP = 13                 # Leading bars of a period slice with NaN RSI, dropped before the fit
+MAX_BACKTEST_SYMBOLS = 500
+MAX_BACKTEST_HORIZON = 20     # Bars a trade may stay open (about a month)
+MAX_REFIT_EVERY = 252
+OUTCOME_CHUNK = 50000         # Trades resolved per pass (bounds memory at chunk x horizon)
+
+
+def backtest_matrix(close, high=None, low=None, eval_bars=252, window=252, refit_every=21, horizon=1):
+    """
+    close/high/low: (symbols x bars) matrices, NaN for missing bars.
+    Evaluates the signal on each of the last `eval_bars` bars, each model
+    seeing the `window` bars up to and including the refit bar (less the
+    RSI warm-up, like a period slice in predict_intraday).
+    Returns a dict of per-symbol arrays (see summarize()).
+    """
+    ind = indicators.compute_indicators(close, high, low)
+    close = ind["Close"]
+    high = ind.get("High", close)
+    low = ind.get("Low", close)
+    valid = ind["valid"]
+    n_symbols, n_bars = close.shape
+
+    # Work in units of each symbol's average price so one solver fits all
+    scale = np.nanmean(np.where(valid, close, np.nan), axis=1)
+    scale[~np.isfinite(scale) | (scale == 0)] = 1.0
+    scale = scale[:, None]
+
+    X = np.stack([ind[f] / scale if f in PRICE_FEATURES else ind[f] for f in FEATURES], axis=-1)
+    X = np.nan_to_num(X)
+
+    # Training row u predicts close[u + 1]
+    target = np.full((n_symbols, n_bars), np.nan)
+    target[:, :-1] = close[:, 1:] / scale
+    usable = valid & np.isfinite(target)
+    target = np.nan_to_num(target)
+
+    # --- Walk-forward: refit at the start of each block, predict inside it ---
+    first = max(1, n_bars - eval_bars)
+    # predict_intraday drops the slice's RSI warm-up bars (slices too short
+    # for RSI get a constant 50 instead and keep every bar)
+    window = window - RSI_WARMUP if window > RSI_WARMUP else window
+    pred = np.full((n_symbols, n_bars), np.nan)
+    atr = np.full((n_symbols, n_bars), np.nan)
+
+    # The training window only slides forward, so each refit adds the rows
+    # that entered it and drops the ones that left (see RecursiveLeastSquares)
+    weights = usable.astype(float)
+    n_usable = np.maximum(weights.sum(axis=1), 1)
+    rls = RecursiveLeastSquares(
+        n_symbols, len(FEATURES),
+        shift=np.einsum("nbf,nb->nf", X, weights) / n_usable[:, None],
+        shift_y=(target * weights).sum(axis=1) / n_usable,
+    )
+    window_lo = window_hi = max(0, first - window + 1)
+
+    for start in range(first, n_bars, refit_every):
+        stop = min(start + refit_every, n_bars)
+        lo = max(0, start - window + 1)
+
+        # Train on rows [lo, start): their next close is known at `start` (u + 1 <= start)
+        dropped = slice(window_lo, min(lo, window_hi))
+        added = slice(max(lo, window_hi), start)
+        rls.remove(X[:, dropped], target[:, dropped], weights[:, dropped])
+        rls.add(X[:, added], target[:, added], weights[:, added])
+        window_lo, window_hi = lo, start
+
+        coef, intercept = rls.coefficients()
+        coef[rls.count < MIN_TRAINING_ROWS] = np.nan
+
+        # A window with no more rows than features has many exact fits; solve
+        # those few with fit_least_squares, as the live path does
+        for i in np.nonzero((rls.count >= MIN_TRAINING_ROWS) & (rls.count <= len(FEATURES)))[0]:
+            train = usable[i, lo:start]
+            model = fit_least_squares(X[i, lo:start][train], target[i, lo:start][train])
+            coef[i], intercept[i] = model.coef_, model.intercept_
+
+        pred[:, start:stop] = np.einsum("ntf,nf->nt", X[:, start:stop], coef) + intercept[:, None]
+
+        # ATR: mean Volatility over the window incl. the refit bar, as predict_intraday does
+        known = valid[:, lo:start + 1]
+        count = known.sum(axis=1, keepdims=True)
+        vol_sum = np.where(known, ind["Volatility"][:, lo:start + 1], 0.0).sum(axis=1, keepdims=True)
+        atr[:, start:stop] = np.where(count > 0, vol_sum / np.maximum(count, 1), np.nan)
+
+    pred = pred * scale
+
+    # --- Signal rules (same as predict_intraday) ---
+    rsi = ind["RSI"]
+    direction = np.zeros((n_symbols, n_bars), dtype=np.int8)
+    direction[(pred > close) & ~(rsi > 70)] = 1   # BUY unless overbought
+    direction[(pred < close) & ~(rsi < 30)] = -1  # SELL unless oversold
+    direction[~valid | ~np.isfinite(pred) | ~np.isfinite(atr)] = 0
+
+    entry = close
+    target_price = np.where(direction > 0, pred + atr, pred - atr)
+    stop_price = np.where(direction > 0, close - 1.5 * atr, close + 1.5 * atr)
+
+    exit_price, hit = resolve_trades(direction, close, high, low, target_price, stop_price, horizon)
+
+    traded = (direction != 0) & np.isfinite(exit_price)
+    returns = np.where(traded, direction * (exit_price - entry) / entry, 0.0)
+
+    return {"traded": traded, "hit": hit & traded, "returns": returns, "horizon": horizon}
+
+
+def resolve_trades(direction, close, high, low, target_price, stop_price, horizon):
+    """
+    Exit price and target-hit flag of every trade over the next `horizon`
+    bars: the first bar touching the stop or the target closes it, the stop
+    winning when both are touched in one bar (conservative); a trade still
+    open after `horizon` bars closes at that bar's close. NaN exit when the
+    data runs out first.
+
+    Only the bars with a trade are looked at: their next `horizon` highs and
+    lows are gathered into one (trades x horizon) block per chunk, and the
+    first touch is an argmax over it.
+    """
+    n_symbols, n_bars = close.shape
+    exit_price = np.full((n_symbols, n_bars), np.nan)
+    hit = np.zeros((n_symbols, n_bars), dtype=bool)
+
+    # Padding with NaN lets windows run past the last bar (NaN never touches)
+    pad = np.full((n_symbols, horizon), np.nan)
+    high_pad = np.concatenate([high, pad], axis=1)
+    low_pad = np.concatenate([low, pad], axis=1)
+    close_pad = np.concatenate([close, pad], axis=1)
+    steps = np.arange(1, horizon + 1)
+
+    rows, cols = np.nonzero(direction)
+    for i in range(0, len(rows), OUTCOME_CHUNK):
+        r, c = rows[i:i + OUTCOME_CHUNK], cols[i:i + OUTCOME_CHUNK]
+        ahead = c[:, None] + steps                   # (trades, horizon) bar indices
+        hi, lo = high_pad[r[:, None], ahead], low_pad[r[:, None], ahead]
+        long_ = (direction[r, c] > 0)[:, None]
+        stop, target = stop_price[r, c][:, None], target_price[r, c][:, None]
+
+        stop_touch = np.where(long_, lo <= stop, hi >= stop)
+        target_touch = np.where(long_, hi >= target, lo <= target)
+        # First touching step, or `horizon` if never touched
+        first_stop = np.where(stop_touch.any(axis=1), stop_touch.argmax(axis=1), horizon)
+        first_target = np.where(target_touch.any(axis=1), target_touch.argmax(axis=1), horizon)
+
+        stopped = (first_stop < horizon) & (first_stop <= first_target)
+        reached = ~stopped & (first_target < horizon)
+
+        exit_ = np.where(stopped, stop[:, 0], close_pad[r, c + horizon])
+        exit_price[r, c] = np.where(reached, target[:, 0], exit_)
+        hit[r, c] = reached
+
+    return exit_price, hit
+
+
+def summarize(result, symbols):
+    traded, hit, returns = result["traded"], result["hit"], result["returns"]
+    trades = traded.sum(axis=1)
+
+    # Overlapping trades (horizon > 1) each get 1/horizon of the capital
+    equity = np.cumprod(1 + returns / result["horizon"], axis=1)
+    drawdown = equity / np.maximum.accumulate(equity, axis=1) - 1
+
+    per_symbol = []
+    for i, symbol in enumerate(symbols):
+        n = int(trades[i])
+        per_symbol.append({
+            "symbol": symbol,
+            "trades": n,
+            "hit_rate": round(float(hit[i].sum() / n), 4) if n else None,
+            "avg_trade_return": round(float(returns[i][traded[i]].mean()), 6) if n else None,
+            "total_return": round(float(equity[i, -1] - 1), 6) if equity.shape[1] else 0.0,
+            "max_drawdown": round(float(drawdown[i].min()), 6) if drawdown.shape[1] else 0.0,
+        })
+
+    total_trades = int(trades.sum())
+    return {
+        "symbols": len(symbols),
+        "trades": total_trades,
+        "hit_rate": round(float(hit.sum() / total_trades), 4) if total_trades else None,
+        "avg_total_return": round(float(np.mean([s["total_return"] for s in per_symbol])), 6) if per_symbol else 0.0,
+        "worst_drawdown": round(float(min((s["max_drawdown"] for s in per_symbol), default=0.0)), 6),
+        "per_symbol": per_symbol,
+    }
+
+
+def run_backtest(symbols, period="1yr", refit_every=21, window=None, horizon=1):
+    """
+    Backtests the signal on the stored history of each symbol over the last
+    `period`, training on the same `period`-long window as the live signal
+    unless `window` is given. Uses the local history store (syncing stale
+    symbols first).
+    """
+    eval_bars = ml_engine.PERIOD_MAP.get(period, 252)
+    symbols = list(dict.fromkeys(ml_engine.normalize_symbol(s) for s in symbols if s.strip()))
+
+    # Stale symbols sync from the API, so load them concurrently
+    all_series = ml_engine.io_pool.map(ml_engine.load_series, symbols)
+
+    closes, highs, lows, found = [], [], [], []
+    for symbol, series in zip(symbols, all_series):
+        if series is None:
+            continue
+        found.append(symbol)
+        closes.append(series["Close"].to_numpy())
+        highs.append(series["High"].to_numpy() if "High" in series else series["Close"].to_numpy())
+        lows.append(series["Low"].to_numpy() if "Low" in series else series["Close"].to_numpy())
+
+    if not found:
+        return {"symbols": 0, "trades": 0, "hit_rate": None, "per_symbol": [], "missing": symbols}
+
+    result = backtest_matrix(
+        indicators.stack_series(closes),
+        indicators.stack_series(highs),
+        indicators.stack_series(lows),
+        eval_bars=eval_bars,
+        window=window or eval_bars,
+        refit_every=refit_every,
+        horizon=horizon,
+    )
+
+    report = summarize(result, found)
+    report["period"] = period
+    report["window"] = window or eval_bars
+    report["missing"] = [s for s in symbols if s not in found]
+    return report
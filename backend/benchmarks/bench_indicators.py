@@ -0,0 +1,89 @@
+"""
+Benchmark: per-symbol ml_engine.calculate_technical_indicators (pandas)
+against the vectorized indicators.compute_indicators (NumPy) on a synthetic
+universe, checking that both produce the same values.
+
+Run from the backend folder:
+    python benchmarks/bench_indicators.py --symbols 500 --bars 252
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("INDIAN_API_KEY", "benchmark")
+
+import ml_engine
+import indicators
+
+
+def synthetic_universe(n_symbols, n_bars, seed=42):
+    """
+    Random-walk OHLC series with uneven lengths and a few missing bars.
+    """
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, (n_symbols, n_bars)), axis=1))
+    spread = close * rng.uniform(0.002, 0.03, (n_symbols, n_bars))
+    high, low = close + spread / 2, close - spread / 2
+
+    # Newer listings have shorter histories, and ~1% of bars are missing
+    starts = rng.integers(0, n_bars // 2, n_symbols)
+    starts[: max(1, n_symbols // 20)] = n_bars - 10  # A few very short series
+    missing = (np.arange(n_bars)[None, :] < starts[:, None]) | (rng.random((n_symbols, n_bars)) < 0.01)
+    for m in (close, high, low):
+        m[missing] = np.nan
+    return close, high, low
+
+
+def per_symbol(close, high, low):
+    frames = []
+    for i in range(close.shape[0]):
+        df = pd.DataFrame({"Close": close[i], "High": high[i], "Low": low[i]}).dropna()
+        frames.append(ml_engine.calculate_technical_indicators(df.reset_index(drop=True)))
+    return frames
+
+
+def check_same(frames, result):
+    columns = ["Close", "RSI", "EMA_9", "EMA_21", "Volatility"]
+    for i, df in enumerate(frames):
+        valid = result["valid"][i]
+        assert valid.sum() == len(df), f"row {i}: {valid.sum()} bars vs {len(df)}"
+        for col in columns:
+            np.testing.assert_allclose(result[col][i][valid], df[col].values, rtol=1e-9, atol=1e-9,
+                                       err_msg=f"row {i} column {col}")
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--bars", type=int, default=252)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    close, high, low = synthetic_universe(args.symbols, args.bars)
+
+    pandas_time, frames = timed(lambda: per_symbol(close, high, low), args.repeat)
+    numpy_time, result = timed(lambda: indicators.compute_indicators(close, high, low), args.repeat)
+    check_same(frames, result)
+
+    print(f"{args.symbols} symbols x {args.bars} bars (best of {args.repeat})")
+    print(f"  per-symbol pandas : {pandas_time * 1000:9.2f} ms")
+    print(f"  vectorized numpy  : {numpy_time * 1000:9.2f} ms")
+    print(f"  speedup           : {pandas_time / numpy_time:9.1f}x")
+    print("  results match     : yes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Micro-benchmark suite for the engine hot paths.
+
+Runs fully offline: upstream calls go to the local IndianAPI stub
+(stub_server.py), price history goes to a temporary store, and the
+database is never touched. Timings and peak memory are written to a JSON
+results file so two commits can be compared.
+
+Run from the backend folder:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/<old>.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import tracemalloc
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from stub_server import StubServer
+
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+PORTFOLIO_SYMBOLS = [f"SYM{i:03d}" for i in range(40)]
+BACKTEST_SYMBOLS = [f"BT{i:03d}" for i in range(200)]
+
+
+class Case:
+    def __init__(self, name, fn, repeat, setup=None):
+        self.name = name
+        self.fn = fn
+        self.repeat = repeat
+        self.setup = setup
+
+
+def configure_environment(stub_url, history_dir):
+    """
+    Must run before any backend module is imported: they read these at import time.
+    """
+    os.environ.update({
+        "INDIAN_API_KEY": "benchmark",
+        "INDIAN_API_BASE_URL": stub_url,
+        "HISTORY_STORE_DIR": history_dir,
+        "MF_CATALOG_PATH": os.path.join(history_dir, "mf_catalog.json"),
+        "MF_CATALOG_REFRESH_ENABLED": "false",
+        "GOOGLE_API_KEY": "benchmark",
+        "DATABASE_URL": os.environ.get("BENCH_DATABASE_URL", "sqlite:///" + os.path.join(history_dir, "bench.db")),
+        "PRICE_REFRESH_ENABLED": "false",
+    })
+    # The quote rate limit would dominate the timings; pass it explicitly to measure it
+    os.environ.setdefault("QUOTE_RATE_LIMIT", "0")
+
+
+def build_cases(history_dir):
+    # Backend modules (and bench_indicators, which imports ml_engine) read
+    # their configuration at import time, so import them only now
+    import ml_engine, indicators, recommendation_engine, finance, backtester
+    import main
+    from bench_indicators import synthetic_universe
+
+    close, high, low = synthetic_universe(500, 252)
+    single = pd.DataFrame({"Close": close[-1], "High": high[-1], "Low": low[-1]}).dropna().reset_index(drop=True)
+
+    assets = [
+        SimpleNamespace(id=i, symbol=s, quantity=10, buy_price=100.0, current_price=0.0, price_updated_at=None)
+        for i, s in enumerate(PORTFOLIO_SYMBOLS)
+    ]
+    profile = SimpleNamespace(risk_tolerance="medium")
+
+    def clear_history():
+        ml_engine.model_cache.clear()
+        ml_engine.series_cache.clear()
+        for name in os.listdir(history_dir):
+            if name.endswith((".npy", ".json")):
+                os.remove(os.path.join(history_dir, name))
+
+    def preload_backtest():
+        list(ml_engine.io_pool.map(ml_engine.load_series, BACKTEST_SYMBOLS))
+
+    return [
+        Case("indicators.per_symbol_pandas", lambda: ml_engine.calculate_technical_indicators(single.copy()), 50),
+        Case("indicators.vectorized_500x252", lambda: indicators.compute_indicators(close, high, low), 10),
+        Case("predict_intraday.cold", lambda: ml_engine.predict_intraday("RELIANCE", "1yr"), 5, clear_history),
+        Case("predict_intraday.new_period", lambda: ml_engine.predict_intraday("RELIANCE", "3mo"), 20,
+             lambda: ml_engine.model_cache.clear()),
+        Case("predict_intraday.cached", lambda: ml_engine.predict_intraday("RELIANCE", "3mo"), 50),
+        Case("backtest.200_symbols_1yr", lambda: backtester.run_backtest(BACKTEST_SYMBOLS, "1yr"), 3, preload_backtest),
+        Case("recommendation.get_best_rd_fd", lambda: recommendation_engine.get_best_rd_fd(5000, 3, "RD"), 200),
+        Case("recommendation.generate_portfolio", lambda: recommendation_engine.generate_portfolio(profile, 20000, 1000000, 5), 10,
+             lambda: random.seed(7)),
+        Case("portfolio_summary.cold_40", lambda: main.calculate_portfolio_summary(assets), 5,
+             lambda: finance.quote_cache.clear()),
+        Case("portfolio_summary.cached_40", lambda: main.calculate_portfolio_summary(assets), 50),
+    ]
+
+
+def run_case(case, stub):
+    # Warm-up (imports, first-touch allocations), then timed runs
+    if case.setup:
+        case.setup()
+    case.fn()
+
+    timings = []
+    calls_before = sum(stub.calls.values())
+    for _ in range(case.repeat):
+        if case.setup:
+            case.setup()
+        start = time.perf_counter()
+        case.fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    upstream_calls = (sum(stub.calls.values()) - calls_before) / case.repeat
+
+    # Memory in a separate run: tracemalloc slows everything down
+    if case.setup:
+        case.setup()
+    tracemalloc.start()
+    case.fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "repeat": case.repeat,
+        "min_ms": round(min(timings), 4),
+        "median_ms": round(statistics.median(timings), 4),
+        "mean_ms": round(statistics.fmean(timings), 4),
+        "peak_kb": round(peak / 1024, 1),
+        "upstream_calls": round(upstream_calls, 2),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def compare(current, baseline_path, threshold):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    regressions = []
+    print(f"\nvs {baseline['meta']['commit']} ({baseline_path}), threshold {threshold:.0%}")
+    for name, result in current["results"].items():
+        old = baseline["results"].get(name)
+        if not old:
+            print(f"  {name:40s} new")
+            continue
+        ratio = result["median_ms"] / old["median_ms"] if old["median_ms"] else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  <-- REGRESSION"
+            regressions.append(name)
+        print(f"  {name:40s} {old['median_ms']:10.3f} -> {result['median_ms']:10.3f} ms  x{ratio:5.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency-ms", type=float, default=10, help="Simulated upstream latency per request")
+    parser.add_argument("--filter", default="", help="Only run cases whose name contains this")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Median slowdown counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    history_dir = tempfile.mkdtemp(prefix="bench-history-")
+    try:
+        with StubServer(args.latency_ms) as stub:
+            configure_environment(stub.url, history_dir)
+            cases = [c for c in build_cases(history_dir) if args.filter in c.name]
+
+            results = {}
+            for case in cases:
+                results[case.name] = run_case(case, stub)
+                r = results[case.name]
+                print(f"{case.name:40s} median {r['median_ms']:10.3f} ms  min {r['min_ms']:10.3f} ms  "
+                      f"peak {r['peak_kb']:9.1f} KiB  upstream {r['upstream_calls']:g}")
+    finally:
+        shutil.rmtree(history_dir, ignore_errors=True)
+
+    commit = git_commit()
+    current = {
+        "meta": {
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "latency_ms": args.latency_ms,
+        },
+        "results": results,
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(current, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        regressions = compare(current, args.compare, args.threshold)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
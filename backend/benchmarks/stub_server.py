@@ -0,0 +1,139 @@
+"""
+Local stand-in for the IndianAPI endpoints the backend calls:
+/stock, /historical_data and /mutual_fund.
+
+Responses are synthetic but deterministic per symbol, and every request can
+be delayed by a fixed latency to mimic the real network round-trip.
+Point the backend at it with INDIAN_API_BASE_URL=http://127.0.0.1:<port>.
+"""
+import json
+import time
+import zlib
+import threading
+import datetime
+import numpy as np
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qsl
+
+PERIOD_BARS = {"1m": 22, "6m": 126, "1yr": 252, "3yr": 756, "5yr": 1260}
+
+
+def _rng(symbol):
+    return np.random.default_rng(zlib.crc32(symbol.upper().encode()))
+
+
+def price_path(symbol, bars):
+    """
+    Deterministic random walk ending on the last business day.
+    """
+    rng = _rng(symbol)
+    closes = 100 + 4000 * rng.random() * np.exp(np.cumsum(rng.normal(0.0003, 0.015, 1260)))
+    end = np.datetime64(datetime.date.today(), "D")
+    dates = np.busday_offset(end, -np.arange(bars)[::-1], roll="backward")
+    return dates, closes[-bars:]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    calls = None  # Shared Counter-like dict, set by StubServer
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = dict(parse_qsl(url.query))
+        endpoint = url.path.rstrip("/").rsplit("/", 1)[-1]
+
+        if self.calls is not None:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        if endpoint == "stock":
+            body = self.stock(query.get("name", ""))
+        elif endpoint == "historical_data":
+            body = self.historical(query.get("stock_name", ""), query.get("period", "1yr"))
+        elif endpoint == "mutual_fund":
+            body = self.mutual_funds(query.get("name", ""))
+        else:
+            self.send_error(404)
+            return
+
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def stock(self, name):
+        symbol = name.replace(".NS", "").replace(".BO", "")
+        _, closes = price_path(symbol, 1)
+        rng = _rng(symbol)
+        return {
+            "companyName": f"{symbol} Ltd",
+            "currentPrice": {"NSE": f"{closes[-1]:.2f}", "BSE": f"{closes[-1] * 0.999:.2f}"},
+            "percentChange": f"{rng.normal(0, 2):.2f}",
+            "recosBar": {
+                "strongBuy": int(rng.integers(0, 10)),
+                "buy": int(rng.integers(0, 10)),
+                "hold": int(rng.integers(0, 10)),
+                "sell": int(rng.integers(0, 5)),
+                "strongSell": int(rng.integers(0, 5)),
+            },
+        }
+
+    def historical(self, name, period):
+        dates, closes = price_path(name, PERIOD_BARS.get(period, 252))
+        values = [[str(d), f"{c:.2f}"] for d, c in zip(dates, closes)]
+        return {"datasets": [{"metric": "Price", "label": "Price on NSE", "values": values}]}
+
+    def mutual_funds(self, name):
+        rng = _rng(name)
+        return [
+            {"schemeName": f"Stub {name} Fund {i} - Direct Growth", "nav": round(float(10 + 200 * rng.random()), 4)}
+            for i in range(20)
+        ]
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer:
+    """
+    Runs the stub on a background thread. Use as a context manager.
+    """
+
+    def __init__(self, latency_ms=0, port=0):
+        self.calls = {}
+        handler = type("Handler", (StubHandler,), {"latency": latency_ms / 1000.0, "calls": self.calls})
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    with StubServer(args.latency_ms, args.port) as server:
+        print(f"IndianAPI stub listening on {server.url}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
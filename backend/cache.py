@@ -0,0 +1,182 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class _InFlight:
+    """
+    A load that one caller is running on behalf of everyone else.
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.ok = False
+
+
+class TTLCache:
+    """
+    Process-wide, thread-safe cache with a TTL per entry and LRU eviction
+    once `maxsize` is reached.
+
+    Loads are single-flight: when several threads miss on the same key at
+    once, only the first one calls the loader and the rest wait for its result.
+    """
+
+    def __init__(self, ttl, maxsize=1024, name="cache"):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.name = name
+
+        self._data = OrderedDict()  # key -> (value, expires_at)
+        self._inflight = {}         # key -> _InFlight
+        self._lock = threading.Lock()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0  # Misses served by another caller's in-flight load
+        self.evictions = 0
+
+    # --- Basic operations ---
+
+    def _lookup(self, key, now):
+        # Caller must hold the lock
+        entry = self._data.get(key)
+        if entry is None:
+            return False, None
+
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= now:
+            del self._data[key]
+            return False, None
+
+        self._data.move_to_end(key)
+        return True, value
+
+    def _store(self, key, value, ttl, now):
+        # Caller must hold the lock
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = now + ttl if ttl else None
+
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key, default=None):
+        with self._lock:
+            found, value = self._lookup(key, time.monotonic())
+            if found:
+                self.hits += 1
+                return value
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._store(key, value, ttl, time.monotonic())
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        # Does not touch the counters or the LRU order
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and (entry[1] is None or entry[1] > time.monotonic())
+
+    def __len__(self):
+        return len(self._data)
+
+    def snapshot(self):
+        """
+        [(key, value, seconds left or None)] for live entries, least recently
+        used first, e.g. for persisting the cache. Does not touch the counters.
+        """
+        with self._lock:
+            now = time.monotonic()
+            return [
+                (key, value, None if expires_at is None else expires_at - now)
+                for key, (value, expires_at) in self._data.items()
+                if expires_at is None or expires_at > now
+            ]
+
+    # --- Single-flight loading ---
+
+    def get_many(self, keys, loader, cacheable=None, timeout=None):
+        """
+        Returns {key: value} for all keys.
+        Missing keys are loaded with `loader(missing_keys) -> {key: value}`;
+        keys already being loaded by another thread are waited on instead.
+        Values for which `cacheable(value)` is False are returned but not stored.
+        """
+        results = {}
+        to_load = []
+        to_wait = {}
+
+        with self._lock:
+            now = time.monotonic()
+            for key in dict.fromkeys(keys):
+                found, value = self._lookup(key, now)
+                if found:
+                    self.hits += 1
+                    results[key] = value
+                elif key in self._inflight:
+                    self.coalesced += 1
+                    to_wait[key] = self._inflight[key]
+                else:
+                    self.misses += 1
+                    call = _InFlight()
+                    self._inflight[key] = call
+                    to_load.append((key, call))
+
+        if to_load:
+            loaded = {}
+            try:
+                loaded = loader([key for key, _ in to_load]) or {}
+            finally:
+                with self._lock:
+                    now = time.monotonic()
+                    for key, call in to_load:
+                        if key in loaded:
+                            call.value = loaded[key]
+                            call.ok = True
+                            if cacheable is None or cacheable(call.value):
+                                self._store(key, call.value, None, now)
+                        self._inflight.pop(key, None)
+                        call.event.set()
+
+            for key, call in to_load:
+                if call.ok:
+                    results[key] = call.value
+
+        for key, call in to_wait.items():
+            # If the other load failed or timed out, leave the key out and
+            # let the caller apply its own fallback.
+            if call.event.wait(timeout) and call.ok:
+                results[key] = call.value
+
+        return results
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "name": self.name,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -1,39 +1,150 @@
+"""
+Query builders and helpers on sync sessions, shared by crud_async (the
+endpoints), the bulk importer and startup. Endpoint CRUD lives in crud_async.
+"""
+from sqlalchemy import tuple_, select, delete, insert, update, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
-import models, schemas, auth
+from datetime import datetime, timezone
+import base64
+import json
+import models, schemas
 
-def get_user_by_email(db: Session, email: str):
-    return db.query(models.User).filter(models.User.email == email).first()
+# --- Transaction pagination ---
+# Newest first, keyed on (date, id) so every page is one index range scan
+# on ix_transactions_user_date_id, however deep it is. The cursor is the
+# (date, id) of the last row of the previous page, base64-encoded.
 
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = auth.get_password_hash(user.password)
-    db_user = models.User(
-        email=user.email,
-        hashed_password=hashed_password,
-        full_name=user.full_name
-    )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
+def encode_cursor(transaction):
+    key = json.dumps([transaction.date.isoformat(), transaction.id])
+    return base64.urlsafe_b64encode(key.encode()).decode()
+
+def decode_cursor(cursor: str):
+    """
+    Returns (date, id). Raises ValueError for a malformed cursor.
+    """
+    try:
+        date, transaction_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(date), int(transaction_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def transactions_page_query(query, user_id: int, skip: int = 0, limit: int = 100, cursor: str = None):
+    query = query.filter(models.Transaction.user_id == user_id)
+    if cursor:
+        query = query.filter(tuple_(models.Transaction.date, models.Transaction.id) < decode_cursor(cursor))
+    elif skip:
+        query = query.offset(skip) # Legacy offset paging, still in a stable order
+    return query.order_by(models.Transaction.date.desc(), models.Transaction.id.desc()).limit(limit)
 
-def create_transaction(db: Session, transaction: schemas.TransactionCreate, user_id: int):
+# --- Transaction summary (rollup) ---
+# One row per (user, month, category, type). add_to_summary adds to it
+# in the same DB transaction as the insert; rebuild_transaction_summary
+# recomputes it from the raw transactions.
+
+def new_transaction(transaction: schemas.TransactionCreate, user_id: int):
+    # The date is set here rather than by the server default so that the
+    # summary month is known before the row is written
     db_transaction = models.Transaction(**transaction.dict(), user_id=user_id)
-    db.add(db_transaction)
-    db.commit()
-    db.refresh(db_transaction)
+    if db_transaction.date is None:
+        db_transaction.date = datetime.now(timezone.utc)
     return db_transaction
 
-def get_transactions(db: Session, user_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.Transaction)\
-             .filter(models.Transaction.user_id == user_id)\
-             .offset(skip).limit(limit).all()
+def month_key(date: datetime):
+    if date.tzinfo is not None:
+        date = date.astimezone(timezone.utc)
+    return date.strftime("%Y-%m")
+
+def summary_rows(transactions):
+    """
+    Folds transactions into summary increments, one per distinct key.
+    """
+    rows = {}
+    for t in transactions:
+        key = (t.user_id, month_key(t.date), t.category, t.type)
+        row = rows.get(key)
+        if row is None:
+            row = rows[key] = dict(zip(("user_id", "month", "category", "type"), key), total=0.0, count=0)
+        row["total"] += t.amount
+        row["count"] += 1
+    return list(rows.values())
+
+def add_to_summary(db: Session, *transactions):
+    """
+    Adds the transactions to their summary rows, creating rows as needed,
+    inside the caller's DB transaction (the caller commits).
+    A single atomic INSERT ... ON CONFLICT on Postgres and SQLite; other
+    databases update the row if it exists and insert it otherwise.
+    """
+    Summary = models.TransactionSummary
+    values = summary_rows(transactions)
+    dialect_name = db.get_bind().dialect.name
 
-def create_asset(db: Session, asset: schemas.AssetCreate, user_id: int):
-    db_asset = models.Asset(**asset.dict(), user_id=user_id)
-    db.add(db_asset)
+    if dialect_name in ("postgresql", "sqlite"):
+        dialect_insert = pg_insert if dialect_name == "postgresql" else sqlite_insert
+        stmt = dialect_insert(Summary).values(values)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["user_id", "month", "category", "type"],
+            set_={"total": Summary.total + stmt.excluded.total, "count": Summary.count + stmt.excluded.count},
+        ))
+        return
+
+    for row in values:
+        key = (Summary.user_id == row["user_id"], Summary.month == row["month"],
+               Summary.category == row["category"], Summary.type == row["type"])
+        increment = update(Summary).where(*key).values(
+            total=Summary.total + row["total"], count=Summary.count + row["count"]
+        )
+        if db.execute(increment).rowcount:
+            continue
+        try:
+            # Savepoint: if another request created the row meanwhile, the
+            # unique constraint fails only this insert and we add to that row
+            with db.begin_nested():
+                db.execute(insert(Summary).values(row))
+        except IntegrityError:
+            db.execute(increment)
+
+def month_expression(dialect_name: str):
+    if dialect_name == "postgresql":
+        return func.to_char(func.timezone("UTC", models.Transaction.date), "YYYY-MM")
+    if dialect_name in ("mysql", "mariadb"):
+        return func.date_format(models.Transaction.date, "%Y-%m")
+    return func.strftime("%Y-%m", models.Transaction.date)
+
+def rebuild_transaction_summary(db: Session, user_id: int = None):
+    """
+    Recomputes the summary rows (for one user, or everyone) with a single
+    INSERT ... SELECT ... GROUP BY. Returns the number of rows written.
+    """
+    Summary, Transaction = models.TransactionSummary, models.Transaction
+    month = month_expression(db.get_bind().dialect.name)
+
+    grouped = select(
+        Transaction.user_id, month, Transaction.category, Transaction.type,
+        func.sum(Transaction.amount), func.count(),
+    ).filter(Transaction.user_id.isnot(None)).group_by(
+        Transaction.user_id, month, Transaction.category, Transaction.type
+    )
+    clear = delete(Summary)
+    if user_id is not None:
+        grouped = grouped.filter(Transaction.user_id == user_id)
+        clear = clear.filter(Summary.user_id == user_id)
+
+    db.execute(clear)
+    result = db.execute(
+        insert(Summary).from_select(["user_id", "month", "category", "type", "total", "count"], grouped)
+    )
     db.commit()
-    db.refresh(db_asset)
-    return db_asset
+    return result.rowcount
 
-def get_assets(db: Session, user_id: int):
-    return db.query(models.Asset).filter(models.Asset.user_id == user_id).all()
\ No newline at end of file
+def ensure_transaction_summary(db: Session):
+    """
+    Builds the summary once for databases that had transactions before it existed.
+    """
+    has_summary = db.execute(select(models.TransactionSummary.id).limit(1)).first()
+    has_transactions = db.execute(select(models.Transaction.id).limit(1)).first()
+    if has_transactions and not has_summary:
+        rebuild_transaction_summary(db)
@@ -0,0 +1,108 @@
+"""
+CRUD for the endpoints, which run on the async engine
+(database.get_async_db). Query builders and the summary rollup shared with
+sync code (importer, startup) come from crud.py.
+"""
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+import models, schemas, auth, crud
+from database import AsyncSessionLocal
+
+EXPORT_BATCH_SIZE = 1000
+
+async def get_user(db: AsyncSession, user_id: int):
+    return await db.get(models.User, user_id)
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    result = await db.execute(select(models.User).filter(models.User.email == email))
+    return result.scalars().first()
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate):
+    # bcrypt is deliberately slow; keep it off the event loop
+    hashed_password = await run_in_threadpool(auth.get_password_hash, user.password)
+    db_user = models.User(
+        email=user.email,
+        hashed_password=hashed_password,
+        full_name=user.full_name
+    )
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+async def update_user(db: AsyncSession, user_id: int, update: schemas.UserUpdate):
+    db_user = await get_user(db, user_id)
+    if db_user is None:
+        return None
+    for field, value in update.dict(exclude_unset=True).items():
+        setattr(db_user, field, value)
+    await db.commit()
+    await db.refresh(db_user)
+    auth.user_cache.invalidate(user_id)
+    return db_user
+
+async def create_transaction(db: AsyncSession, transaction: schemas.TransactionCreate, user_id: int):
+    db_transaction = crud.new_transaction(transaction, user_id)
+    db.add(db_transaction)
+    await db.run_sync(crud.add_to_summary, db_transaction)
+    await db.commit()
+    await db.refresh(db_transaction)
+    return db_transaction
+
+async def get_transactions(db: AsyncSession, user_id: int, skip: int = 0, limit: int = 100, cursor: str = None):
+    query = crud.transactions_page_query(select(models.Transaction), user_id, skip, limit, cursor)
+    result = await db.execute(query)
+    return result.scalars().all()
+
+async def stream_transactions(user_id: int, batch_size: int = EXPORT_BATCH_SIZE):
+    """
+    Yields the user's transactions newest first, as lists of plain rows of
+    up to `batch_size`, read through a server-side cursor. Opens its own
+    session, since it outlives the request's dependencies when streamed.
+    """
+    Transaction = models.Transaction
+    query = (
+        select(Transaction.id, Transaction.date, Transaction.type, Transaction.category, Transaction.amount, Transaction.note)
+        .filter(Transaction.user_id == user_id)
+        .order_by(Transaction.date.desc(), Transaction.id.desc())
+        .execution_options(yield_per=batch_size)
+    )
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query)
+        async for rows in result.partitions():
+            yield rows
+
+async def get_transaction_summary(db: AsyncSession, user_id: int, since_month: str = None):
+    Summary = models.TransactionSummary
+    query = select(Summary).filter(Summary.user_id == user_id)
+    if since_month:
+        query = query.filter(Summary.month >= since_month)
+    result = await db.execute(query.order_by(Summary.month.desc(), Summary.type, Summary.total.desc()))
+    return result.scalars().all()
+
+async def rebuild_transaction_summary(db: AsyncSession, user_id: int = None):
+    return await db.run_sync(crud.rebuild_transaction_summary, user_id)
+
+async def create_asset(db: AsyncSession, asset: schemas.AssetCreate, user_id: int):
+    db_asset = models.Asset(**asset.dict(), user_id=user_id)
+    db.add(db_asset)
+    await db.commit()
+    await db.refresh(db_asset)
+    return db_asset
+
+async def get_assets(db: AsyncSession, user_id: int):
+    result = await db.execute(select(models.Asset).filter(models.Asset.user_id == user_id))
+    return result.scalars().all()
+
+async def get_asset(db: AsyncSession, asset_id: int, user_id: int):
+    result = await db.execute(
+        select(models.Asset).filter(models.Asset.id == asset_id, models.Asset.user_id == user_id)
+    )
+    return result.scalars().first()
+
+async def count_predictions(db: AsyncSession, user_id: int):
+    result = await db.execute(
+        select(func.count()).select_from(models.Prediction).filter(models.Prediction.user_id == user_id)
+    )
+    return result.scalar_one()
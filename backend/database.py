@@ -1,4 +1,6 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -15,12 +17,11 @@ connect_args = {}
 if SQLALCHEMY_DATABASE_URL.startswith("postgresql"):
     connect_args = {"sslmode": "require"}
 
+# Sync engine: startup (create_all) and the background price refresher
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     pool_pre_ping=True,
-    connect_args={
-        "sslmode": "require"
-    }
+    connect_args=connect_args
 )
 
 SessionLocal = sessionmaker(
@@ -36,4 +37,47 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# --- Async engine (used by the API endpoints) ---
+# Requests waiting on the database do not hold a threadpool slot, so one
+# worker can keep many of them in flight; DB_POOL_SIZE caps open connections.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+
+def to_async_url(url):
+    """
+    Maps the sync DATABASE_URL onto its async driver:
+    postgresql -> postgresql+asyncpg, sqlite -> sqlite+aiosqlite.
+    """
+    url = make_url(url)
+    if url.get_backend_name() == "postgresql":
+        # asyncpg takes ssl as a connect argument, not libpq URL options
+        return url.set(drivername="postgresql+asyncpg").difference_update_query(["sslmode", "channel_binding"])
+    if url.get_backend_name() == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    return url
+
+ASYNC_DATABASE_URL = make_url(os.getenv("ASYNC_DATABASE_URL") or to_async_url(SQLALCHEMY_DATABASE_URL))
+
+async_engine_args = {"pool_pre_ping": True}
+if ASYNC_DATABASE_URL.get_backend_name() == "postgresql":
+    async_engine_args.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        connect_args={"ssl": "require"},
+    )
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **async_engine_args)
+
+# expire_on_commit=False: returned rows stay readable after commit without
+# an implicit (and, under asyncio, illegal) lazy reload
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
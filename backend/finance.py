@@ -1,64 +1,162 @@
 import os
 import requests
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
+from cache import TTLCache
+import metrics
 
 load_dotenv()
 
 API_KEY = os.getenv("INDIAN_API_KEY")
-BASE_URL = "https://stock.indianapi.in/stock"
+BASE_URL = os.getenv("INDIAN_API_BASE_URL", "https://stock.indianapi.in") + "/stock"
+
+# --- Fetcher Configuration ---
+QUOTE_MAX_WORKERS = int(os.getenv("QUOTE_MAX_WORKERS", "8"))       # Parallel requests in flight
+QUOTE_RATE_LIMIT = float(os.getenv("QUOTE_RATE_LIMIT", "10"))      # Requests per second (0 = unlimited)
+QUOTE_RATE_BURST = float(os.getenv("QUOTE_RATE_BURST", "50"))      # Requests sent unthrottled, e.g. a whole portfolio
+QUOTE_TIMEOUT = float(os.getenv("QUOTE_TIMEOUT", "5"))             # Per-call timeout in seconds
+QUOTE_CACHE_TTL = float(os.getenv("QUOTE_CACHE_TTL", "60"))        # Seconds a quote stays fresh
+QUOTE_CACHE_SIZE = int(os.getenv("QUOTE_CACHE_SIZE", "2048"))      # Max symbols kept in memory
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket. Replaces the old fixed sleep after every call:
+    requests go out immediately while tokens are available, and only wait
+    when the configured rate is actually exceeded.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+
+# Shared across all callers so the whole process respects the upstream limit
+rate_limiter = RateLimiter(QUOTE_RATE_LIMIT, QUOTE_RATE_BURST)
+
+
+def parse_price(data):
+    """
+    Extracts the current price from an IndianAPI /stock payload.
+    """
+    # Check for various price keys depending on exact endpoint version
+    price = data.get("currentPrice") or data.get("lastPrice") or data.get("price")
+
+    # Sometimes price is a dictionary like {"NSE": 2400, "BSE": 2399}
+    if isinstance(price, dict):
+        price = price.get("NSE") or price.get("BSE")
+
+    return float(price) if price else None
+
+
+def fetch_quote(session, symbol):
+    """
+    Fetches a single quote. Returns 0.0 on any failure so one bad symbol
+    never breaks the whole portfolio.
+    """
+    try:
+        rate_limiter.acquire()
+
+        # IndianAPI often expects standard symbols.
+        # If your DB stores "RELIANCE", we might need to query "RELIANCE" or "RELIANCE.NS".
+        # Let's try the symbol directly first.
+        params = {"name": symbol}
+
+        with metrics.upstream(BASE_URL):
+            response = session.get(BASE_URL, params=params, timeout=QUOTE_TIMEOUT)
+
+        if response.status_code == 200:
+            price = parse_price(response.json())
+
+            if price:
+                return price
+
+            print(f"Price not found in response for {symbol}")
+        else:
+            print(f"Failed to fetch {symbol}: {response.status_code} - {response.text}")
+
+    except Exception as e:
+        print(f"Error fetching {symbol}: {e}")
+
+    return 0.0
+
 
 def get_live_prices(symbols: list):
     """
     Fetches live prices for Indian stocks using IndianAPI.in.
+    Quotes are requested in parallel (up to QUOTE_MAX_WORKERS at a time),
+    so latency follows the slowest quote instead of the number of holdings.
     Input: ['RELIANCE', 'TCS', 'INFY']
     Output: {'RELIANCE': 2450.00, 'TCS': 3500.50, ...}
     """
     if not symbols:
         return {}
 
-    prices = {}
-    
+    # De-duplicate while keeping order (same stock held in two lots)
+    unique_symbols = list(dict.fromkeys(symbols))
+    workers = max(1, min(QUOTE_MAX_WORKERS, len(unique_symbols)))
+
     # Create a session for faster repeated requests
+    # The connection pool must be as large as the worker count, otherwise
+    # parallel calls queue up on the default pool of 10 connections.
     session = requests.Session()
     session.headers.update({"X-Api-Key": API_KEY})
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(lambda symbol: fetch_quote(session, symbol), unique_symbols)
+            return dict(zip(unique_symbols, results))
+    finally:
+        session.close()
+
+
+# Shared by every request in the process, so users holding the same stocks
+# (and the several calls the frontend makes on page load) reuse one fetch.
+quote_cache = TTLCache(ttl=QUOTE_CACHE_TTL, maxsize=QUOTE_CACHE_SIZE, name="quotes")
+
+
+def get_cached_prices(symbols: list):
+    """
+    Same contract as get_live_prices(), but served from the process-wide
+    quote cache. Only symbols that are missing or expired go upstream, and
+    concurrent misses on the same symbol share a single fetch.
+    """
+    if not symbols:
+        return {}
+
+    prices = quote_cache.get_many(
+        symbols,
+        get_live_prices,
+        cacheable=lambda price: price > 0,  # Never pin a failed quote
+        timeout=QUOTE_TIMEOUT * 2,
+    )
 
-    for symbol in symbols:
-        try:
-            # IndianAPI often expects standard symbols. 
-            # If your DB stores "RELIANCE", we might need to query "RELIANCE" or "RELIANCE.NS".
-            # Let's try the symbol directly first.
-            params = {"name": symbol}
-            
-            response = session.get(BASE_URL, params=params)
-            
-            if response.status_code == 200:
-                data = response.json()
-                # The API structure usually returns a 'currentPrice' or similar field.
-                # Adjust key access based on exact API response structure.
-                # Common structure: {'companyName': ..., 'currentPrice': 2400.00, ...}
-                
-                # Check for various price keys depending on exact endpoint version
-                price = data.get("currentPrice") or data.get("lastPrice") or data.get("price")
-                
-                # Sometimes price is a dictionary like {"NSE": 2400, "BSE": 2399}
-                if isinstance(price, dict):
-                    price = price.get("NSE") or price.get("BSE")
-                
-                if price:
-                    prices[symbol] = float(price)
-                else:
-                    print(f"Price not found in response for {symbol}")
-                    prices[symbol] = 0.0
-            else:
-                print(f"Failed to fetch {symbol}: {response.status_code} - {response.text}")
-                prices[symbol] = 0.0
-                
-        except Exception as e:
-            print(f"Error fetching {symbol}: {e}")
-            prices[symbol] = 0.0
-            
-        # Respect rate limits (avoid getting banned)
-        time.sleep(0.1) 
-
-    return prices
\ No newline at end of file
+    # A waiter whose leader failed gets the same fallback as a failed fetch
+    return {symbol: prices.get(symbol, 0.0) for symbol in symbols}
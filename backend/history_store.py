@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import threading
+import numpy as np
+import pandas as pd
+
+# Column layout of every stored array. Dates are kept as days since epoch
+# so the whole file is a single float64 matrix that can be memory-mapped.
+COLUMNS = ["Date", "Open", "High", "Low", "Close", "Volume"]
+MAX_BARS = int(os.getenv("HISTORY_MAX_BARS", "1000"))  # ~4 years of trading days
+
+
+class HistoryStore:
+    """
+    Local on-disk OHLCV store: one memory-mapped .npy matrix per symbol plus
+    a small JSON sidecar holding the sync time and which columns the API sent.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _paths(self, symbol):
+        name = symbol.upper().replace("/", "_")
+        return os.path.join(self.root, f"{name}.npy"), os.path.join(self.root, f"{name}.json")
+
+    def read(self, symbol):
+        """
+        Returns (bars, meta) with bars memory-mapped read-only,
+        or (None, None) if the symbol was never synced.
+        """
+        data_path, meta_path = self._paths(symbol)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            bars = np.load(data_path, mmap_mode="r")
+        except (FileNotFoundError, ValueError):
+            return None, None
+        return bars, meta
+
+    def last_date(self, symbol):
+        bars, _ = self.read(symbol)
+        if bars is None or len(bars) == 0:
+            return None
+        return pd.Timestamp(int(bars[-1, 0]), unit="D")
+
+    def append(self, symbol, df):
+        """
+        Merges a freshly downloaded frame into the store, keeping only bars
+        newer than the last stored one. Returns the number of bars added.
+        """
+        new_bars, columns = frame_to_bars(df)
+
+        with self._lock:
+            bars, meta = self.read(symbol)
+            if bars is not None and len(bars) > 0:
+                new_bars = new_bars[new_bars[:, 0] > bars[-1, 0]]
+                merged = np.concatenate([np.asarray(bars), new_bars])
+                columns = [c for c in COLUMNS if c in columns or c in meta["columns"]]
+            else:
+                merged = new_bars
+
+            # A page without e.g. Volume leaves NaN in a column other pages filled
+            merged = fill_missing(merged[-MAX_BARS:])
+            self._write(symbol, merged, {"synced_at": time.time(), "columns": columns})
+
+        return len(new_bars)
+
+    def touch(self, symbol):
+        """
+        Marks the symbol as synced without new bars (e.g. market holiday).
+        """
+        with self._lock:
+            bars, meta = self.read(symbol)
+            if bars is not None:
+                meta["synced_at"] = time.time()
+                self._write_meta(symbol, meta)
+
+    def _write(self, symbol, bars, meta):
+        data_path, _ = self._paths(symbol)
+        # Write-then-rename so readers never see a half-written file
+        tmp_path = data_path + ".tmp.npy"
+        np.save(tmp_path, np.ascontiguousarray(bars, dtype=np.float64))
+        os.replace(tmp_path, data_path)
+        self._write_meta(symbol, meta)
+
+    def _write_meta(self, symbol, meta):
+        _, meta_path = self._paths(symbol)
+        tmp_path = meta_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def frame(self, symbol, rows=None):
+        """
+        Returns the last `rows` bars as a DataFrame (all bars if rows is None),
+        with the same columns the API originally sent. No network access.
+        """
+        bars, meta = self.read(symbol)
+        if bars is None or len(bars) == 0:
+            return None
+        return bars_to_frame(bars if rows is None else bars[-rows:], meta["columns"])
+
+
+def frame_to_bars(df):
+    """
+    DataFrame (Date + price columns) -> (float64 matrix in COLUMNS order, present columns).
+    """
+    present = [c for c in COLUMNS if c in df.columns]
+    bars = np.full((len(df), len(COLUMNS)), np.nan)
+
+    dates = pd.to_datetime(df["Date"]).values.astype("datetime64[D]")
+    bars[:, 0] = dates.astype(np.int64)
+    for i, col in enumerate(COLUMNS[1:], start=1):
+        if col in df.columns:
+            bars[:, i] = pd.to_numeric(df[col], errors="coerce").values
+
+    # Oldest first, one bar per day
+    order = np.argsort(bars[:, 0], kind="stable")
+    bars = bars[order]
+    keep = np.append(bars[1:, 0] != bars[:-1, 0], True) if len(bars) else np.array([], dtype=bool)
+    return bars[keep], present
+
+
+def fill_missing(bars):
+    """
+    Defaults the optional columns of bars that lack them, so a bar with a
+    valid close is never dropped over them: Open/High/Low fall back to the
+    close and Volume to 0. Returns a new matrix.
+    """
+    bars = np.array(bars, dtype=np.float64)
+    close = bars[:, COLUMNS.index("Close")]
+    for col in ("Open", "High", "Low"):
+        i = COLUMNS.index(col)
+        missing = np.isnan(bars[:, i])
+        bars[missing, i] = close[missing]
+    volume = bars[:, COLUMNS.index("Volume")]
+    volume[np.isnan(volume)] = 0.0
+    return bars
+
+
+def bars_to_frame(bars, columns):
+    data = {}
+    for col in columns:
+        i = COLUMNS.index(col)
+        if col == "Date":
+            data[col] = np.asarray(bars[:, i]).astype("int64").astype("datetime64[D]")
+        else:
+            data[col] = np.array(bars[:, i])
+    return pd.DataFrame(data)
@@ -0,0 +1,154 @@
+"""
+Vectorized indicator engine.
+
+Takes 2-D price matrices (symbols x bars) and computes the same RSI, EMA_9,
+EMA_21 and Volatility columns as ml_engine.calculate_technical_indicators
+does for a single DataFrame, for every symbol at once.
+
+Series of different lengths or with gaps are handled with masks: invalid
+cells (NaN) are dropped and each row is packed to the right, which is what
+the per-symbol path sees after its dropna(). All outputs are in that packed
+layout, with `valid` marking the cells that survive the final dropna().
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+RSI_WINDOW = 14
+
+
+def stack_series(series_list):
+    """
+    List of 1-D arrays of any length -> right-aligned matrix padded with NaN.
+    """
+    width = max((len(s) for s in series_list), default=0)
+    matrix = np.full((len(series_list), width), np.nan)
+    for i, s in enumerate(series_list):
+        if len(s):
+            matrix[i, width - len(s):] = s
+    return matrix
+
+
+def pack_rows(mask, *matrices):
+    """
+    Moves the cells selected by `mask` to the right end of each row,
+    keeping their order. Returns (lengths, packed matrices...).
+    """
+    n_rows, width = mask.shape
+    lengths = mask.sum(axis=1)
+
+    # Column each kept cell lands in: right-aligned rank within its row
+    rank = np.cumsum(mask, axis=1) - 1
+    target = rank + (width - lengths)[:, None]
+    rows = np.broadcast_to(np.arange(n_rows)[:, None], mask.shape)
+
+    packed = []
+    for m in matrices:
+        out = np.full((n_rows, width), np.nan)
+        out[rows[mask], target[mask]] = m[mask]
+        packed.append(out)
+    return (lengths, *packed)
+
+
+def ema(values, span, start):
+    """
+    EMA with adjust=False along axis 1, seeded at each row's first valid bar.
+    One vector op per bar across all symbols.
+    """
+    alpha = 2.0 / (span + 1.0)
+    out = np.full(values.shape, np.nan)
+    prev = np.full(values.shape[0], np.nan)
+
+    for j in range(values.shape[1]):
+        x = values[:, j]
+        prev = np.where(start == j, x, alpha * x + (1.0 - alpha) * prev)
+        out[:, j] = prev
+    return out
+
+
+def rolling_mean(values, window):
+    """
+    Trailing mean along axis 1 (NaN-free input).
+    Each window is summed directly rather than through a running cumsum, so
+    an all-zero window gives exactly 0 just like pandas does.
+    """
+    out = np.full(values.shape, np.nan)
+    if values.shape[1] >= window:
+        out[:, window - 1:] = sliding_window_view(values, window, axis=1).sum(axis=-1) / window
+    return out
+
+
+def compute_indicators(close, high=None, low=None):
+    """
+    close/high/low: (symbols x bars) float matrices, NaN for missing bars.
+    Returns a dict of packed (symbols x bars) matrices:
+    Close, RSI, EMA_9, EMA_21, Volatility (and High/Low when given),
+    plus `valid` (bool) and `lengths`.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    has_range = high is not None and low is not None
+
+    mask = np.isfinite(close)
+    if has_range:
+        high = np.asarray(high, dtype=np.float64)
+        low = np.asarray(low, dtype=np.float64)
+        mask &= np.isfinite(high) & np.isfinite(low)
+        lengths, close, high, low = pack_rows(mask, close, high, low)
+    else:
+        lengths, close = pack_rows(mask, close)
+
+    n_rows, width = close.shape
+    cols = np.arange(width)
+    start = width - lengths                     # First valid column of each row
+    present = cols[None, :] >= start[:, None]   # Packed mask
+    position = cols[None, :] - start[:, None]   # Bar index within each series
+
+    # 1. Volatility (High - Low)
+    if has_range:
+        volatility = high - low
+    else:
+        volatility = close * 0.01  # Fallback: 1% of close
+
+    # 2. RSI
+    filled = np.where(present, close, 0.0)
+    delta = np.zeros_like(close)
+    delta[:, 1:] = filled[:, 1:] - filled[:, :-1]
+    # The first bar has no previous close: pandas' where() turns it into 0
+    delta[~present | (position == 0)] = 0.0
+
+    gain = rolling_mean(np.maximum(delta, 0.0), RSI_WINDOW)
+    loss = rolling_mean(np.maximum(-delta, 0.0), RSI_WINDOW)
+    loss[loss == 0] = 0.001  # Prevent division by zero
+
+    rsi_ready = position >= RSI_WINDOW - 1
+    with np.errstate(invalid="ignore"):
+        rsi = 100 - (100 / (1 + gain / loss))
+    rsi = np.where(rsi_ready, rsi, np.nan)
+
+    short = lengths < RSI_WINDOW
+    rsi[short] = 50  # Neutral if insufficient data
+
+    # 3. EMAs
+    ema_9 = ema(close, 9, start)
+    ema_9[lengths < 9] = close[lengths < 9]
+    ema_21 = ema(close, 21, start)
+    ema_21[lengths < 21] = close[lengths < 21]
+
+    rsi[~present] = np.nan
+    volatility[~present] = np.nan
+
+    valid = present & (rsi_ready | short[:, None])
+
+    result = {
+        "Close": close,
+        "RSI": rsi,
+        "EMA_9": ema_9,
+        "EMA_21": ema_21,
+        "Volatility": volatility,
+        "valid": valid,
+        "lengths": lengths,
+    }
+    if has_range:
+        result["High"] = high
+        result["Low"] = low
+    return result
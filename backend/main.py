@@ -1,15 +1,24 @@
-from fastapi import FastAPI, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import FastAPI, Depends, File, HTTPException, Request, Response, UploadFile, status
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from typing import List
+from typing import List, Optional
 from datetime import datetime, timedelta
+import io
+import csv
+import json
+import time
 
-import models, schemas, auth, crud, finance, ml_engine, ai, recommendation_engine
-from database import get_db, engine
+import models, schemas, auth, crud, crud_async, finance, ml_engine, ai, recommendation_engine, price_refresher, backtester, metrics, transaction_import, mf_catalog
+from database import get_async_db, engine, async_engine, SessionLocal
 
 app = FastAPI(title="AI Finance Assistant")
 
+MAX_PAGE_SIZE = 500
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -20,72 +29,240 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# --- Request timing (see metrics.py) ---
+metrics.instrument_engine(engine)
+metrics.instrument_engine(async_engine.sync_engine)
+
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    if not metrics.METRICS_ENABLED:
+        return await call_next(request)
+
+    timings, token = metrics.start_request()
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        metrics.end_request(token)
+    elapsed = time.perf_counter() - start
+
+    # Label by route template, not raw path, to keep the series count bounded
+    route = request.scope.get("route")
+    metrics.request_duration.observe(
+        elapsed, request.method, route.path if route else "unmatched", str(response.status_code)
+    )
+    if metrics.SERVER_TIMING_ENABLED:
+        response.headers["Server-Timing"] = metrics.server_timing_header(timings, elapsed)
+    return response
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Prometheus scrape endpoint: request and per-stage latency histograms.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+def add_missing_columns():
+    inspector = inspect(engine)
+    for table in models.Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            with engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            print(f"Schema: added column {table.name}.{column.name}")
+
 @app.on_event("startup")
 def on_startup():
     models.Base.metadata.create_all(bind=engine)
+    # create_all skips tables that already exist, so add newer (nullable)
+    # columns and indexes explicitly
+    add_missing_columns()
+    for table in models.Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    db = SessionLocal()
+    try:
+        crud.ensure_transaction_summary(db)
+    finally:
+        db.close()
+    if price_refresher.PRICE_REFRESH_ENABLED:
+        price_refresher.refresher.start()
+    if mf_catalog.MF_CATALOG_REFRESH_ENABLED:
+        mf_catalog.refresher.start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    price_refresher.refresher.stop()
+    mf_catalog.refresher.stop()
+    await run_in_threadpool(ai.flush_response_cache)
+    ml_engine.shutdown_process_pool()
+    await async_engine.dispose()
+
+# --- Endpoints ---
+# All endpoints are async and use the async engine, so a request waiting on
+# the database holds no thread. Blocking work (bcrypt, the requests-based
+# quote/prediction engines) is handed to the threadpool with run_in_threadpool.
 
 @app.post("/register", response_model=schemas.UserOut)
-def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_email(db, email=user.email)
+async def register_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    db_user = await crud_async.get_user_by_email(db, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    return crud.create_user(db=db, user=user)
+    return await crud_async.create_user(db=db, user=user)
 
 @app.post("/login", response_model=schemas.Token)
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(),
-                           db: Session = Depends(get_db)):
-    user = crud.get_user_by_email(db, email=form_data.username)
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(),
+                                 db: AsyncSession = Depends(get_async_db)):
+    user = await crud_async.get_user_by_email(db, email=form_data.username)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    if not auth.verify_password(form_data.password, user.hashed_password):
+    if not await run_in_threadpool(auth.verify_password, form_data.password, user.hashed_password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    access_token = auth.create_access_token(data={"sub": user.email})
+    access_token = auth.create_user_token(user)
     return {"access_token": access_token, "token_type": "bearer"}
 
+@app.put("/users/me", response_model=schemas.UserOut)
+async def update_profile(
+    update: schemas.UserUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    return await crud_async.update_user(db, user_id=current_user.id, update=update)
+
 @app.post("/transactions/", response_model=schemas.TransactionOut)
-def create_transaction(
+async def create_transaction(
     transaction: schemas.TransactionCreate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    return crud.create_transaction(db=db, transaction=transaction, user_id=current_user.id)
+    return await crud_async.create_transaction(db=db, transaction=transaction, user_id=current_user.id)
 
 @app.get("/transactions/", response_model=List[schemas.TransactionOut])
-def read_transactions(
+async def read_transactions(
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None, # From the X-Next-Cursor header of the previous page
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    # Newest first. One extra row tells us whether there is a next page.
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    try:
+        transactions = await crud_async.get_transactions(
+            db, user_id=current_user.id, skip=skip, limit=limit + 1, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if len(transactions) > limit:
+        transactions = transactions[:limit]
+        response.headers["X-Next-Cursor"] = crud.encode_cursor(transactions[-1])
+    return transactions
+
+@app.post("/transactions/import")
+async def import_transactions(
+    file: UploadFile = File(...),
+    format: str = "auto", # "csv", "statement" or "auto" (detect from the header)
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    return crud.get_transactions(db, user_id=current_user.id, skip=skip, limit=limit)
+    # The upload is spooled to disk by the framework; the importer reads it
+    # row by row in a worker thread and commits in batches
+    if format not in ("auto", "csv", "statement"):
+        raise HTTPException(status_code=400, detail="format must be auto, csv or statement")
+    try:
+        return await run_in_threadpool(transaction_import.import_transactions, file.file, current_user.id, format)
+    except transaction_import.ImportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        await file.close()
+
+@app.get("/transactions/export")
+async def export_transactions(
+    format: str = "csv", # "csv" or "ndjson"
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    # Full history, streamed from a server-side cursor: rows are never
+    # loaded as ORM objects and only one batch is held in memory at a time
+    if format not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be csv or ndjson")
+    fields = ["id", "date", "type", "category", "amount", "note"]
+
+    async def stream_csv():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        async for rows in crud_async.stream_transactions(current_user.id):
+            writer.writerows((r.id, r.date.isoformat(), r.type, r.category, r.amount, r.note) for r in rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    async def stream_ndjson():
+        async for rows in crud_async.stream_transactions(current_user.id):
+            yield "".join(
+                json.dumps({"id": r.id, "date": r.date.isoformat(), "type": r.type,
+                            "category": r.category, "amount": r.amount, "note": r.note}) + "\n"
+                for r in rows
+            )
+
+    if format == "csv":
+        return StreamingResponse(stream_csv(), media_type="text/csv",
+                                 headers={"Content-Disposition": 'attachment; filename="transactions.csv"'})
+    return StreamingResponse(stream_ndjson(), media_type="application/x-ndjson")
+
+@app.get("/transactions/summary", response_model=List[schemas.TransactionSummaryOut])
+async def read_transaction_summary(
+    months: int = 12, # How many calendar months back, including the current one
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    # Answered from the rollup table: one row per month/category/type
+    now = datetime.utcnow()
+    months = max(1, months)
+    index = now.year * 12 + now.month - months # Zero-based month index of the first month shown
+    since_month = f"{index // 12:04d}-{index % 12 + 1:02d}"
+    return await crud_async.get_transaction_summary(db, user_id=current_user.id, since_month=since_month)
+
+@app.post("/transactions/summary/rebuild")
+async def rebuild_transaction_summary(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    rows = await crud_async.rebuild_transaction_summary(db, user_id=current_user.id)
+    return {"message": "Summary rebuilt", "rows": rows}
 
 @app.post("/assets/", response_model=schemas.AssetOut)
-def create_asset(
+async def create_asset(
     asset: schemas.AssetCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    return crud.create_asset(db=db, asset=asset, user_id=current_user.id)
+    return await crud_async.create_asset(db=db, asset=asset, user_id=current_user.id)
 
 @app.get("/assets/", response_model=List[schemas.AssetOut])
-def read_assets(
-    db: Session = Depends(get_db),
+async def read_assets(
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    return crud.get_assets(db, user_id=current_user.id)
+    return await crud_async.get_assets(db, user_id=current_user.id)
 
-@app.post("/chat")
-def chat_with_ai(
-    request: schemas.ChatRequest,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
-):
-    transactions = crud.get_transactions(db, user_id=current_user.id, limit=10)
-    assets = crud.get_assets(db, user_id=current_user.id)
+async def build_chat_context(db: AsyncSession, current_user):
+    """
+    (user_profile, financial_data) for the advisor prompt.
+    """
+    transactions = await crud_async.get_transactions(db, user_id=current_user.id, limit=10)
+    assets = await crud_async.get_assets(db, user_id=current_user.id)
 
     trans_text = "\n".join([f"{t.date.date()}: {t.type} ${t.amount} ({t.category})" for t in transactions]) if transactions else "No recent transactions."
     
@@ -101,18 +278,54 @@ def chat_with_ai(
         "transactions": trans_text,
         "assets": assets_text
     }
+    return user_profile, financial_data
+
+@app.post("/chat")
+async def chat_with_ai(
+    request: schemas.ChatRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    user_profile, financial_data = await build_chat_context(db, current_user)
 
     try:
-        ai_response = ai.ask_ai_advisor(user_profile, financial_data, request.question)
+        ai_response = await ai.ask_ai_advisor_async(user_profile, financial_data, request.question)
         return {"response": ai_response}
     except Exception as e:
         return {"error": str(e), "message": "Failed to contact Gemini API"}
 
+@app.post("/chat/stream")
+async def chat_with_ai_stream(
+    request: schemas.ChatRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """
+    Server-Sent Events: one `data: {"token": ...}` event per chunk as the
+    model generates it, then `event: done`. Failures arrive as `event: error`.
+    """
+    # Read everything from the DB before streaming starts
+    user_profile, financial_data = await build_chat_context(db, current_user)
+
+    async def events():
+        try:
+            async for chunk in ai.stream_ai_advisor(user_profile, financial_data, request.question):
+                yield f"data: {json.dumps({'token': chunk})}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e), 'message': 'Failed to contact Gemini API'})}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # No caching or proxy buffering, or the tokens arrive all at once
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
 @app.post("/predict/intraday")
-def predict_stock(
+async def predict_stock(
     request: schemas.PredictionRequest, # <--- Must use the schema from Step 1
-    db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
     # Debugging: Print to console to see if request arrives
@@ -120,16 +333,56 @@ def predict_stock(
     
     try:
         # Pass both arguments to the engine
-        prediction = ml_engine.predict_intraday(request.symbol, request.period)
+        prediction = await run_in_threadpool(ml_engine.predict_intraday, request.symbol, request.period)
         return prediction
     except Exception as e:
         print(f"Error in endpoint: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/predict/batch")
+async def predict_batch(
+    request: schemas.BatchPredictionRequest,
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    # Results are streamed as NDJSON, one line per (symbol, period), in completion order
+    if not request.symbols:
+        raise HTTPException(status_code=400, detail="No symbols given")
+    if len(request.symbols) * max(1, len(request.periods)) > ml_engine.MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Batch too large (max {ml_engine.MAX_BATCH_ITEMS} symbol/period pairs)")
+
+    def stream():
+        for result in ml_engine.predict_batch(request.symbols, request.periods):
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@app.post("/predict/backtest")
+async def backtest_signals(
+    request: schemas.BacktestRequest,
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    if not request.symbols or len(request.symbols) > backtester.MAX_BACKTEST_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"Give between 1 and {backtester.MAX_BACKTEST_SYMBOLS} symbols")
+    eval_bars = ml_engine.PERIOD_MAP.get(request.period)
+    if eval_bars is None:
+        raise HTTPException(status_code=400, detail=f"period must be one of {', '.join(ml_engine.PERIOD_MAP)}")
+    # Work grows with symbols x bars x horizon, so keep every knob bounded
+    if not 1 <= request.horizon <= min(backtester.MAX_BACKTEST_HORIZON, eval_bars):
+        raise HTTPException(status_code=400, detail=f"horizon must be between 1 and {min(backtester.MAX_BACKTEST_HORIZON, eval_bars)}")
+    if not 1 <= request.refit_every <= min(backtester.MAX_REFIT_EVERY, eval_bars):
+        raise HTTPException(status_code=400, detail=f"refit_every must be between 1 and {min(backtester.MAX_REFIT_EVERY, eval_bars)}")
+
+    return await run_in_threadpool(
+        backtester.run_backtest,
+        request.symbols,
+        period=request.period,
+        refit_every=request.refit_every,
+        horizon=request.horizon
+    )
+
 @app.post("/recommend/portfolio")
-def recommend_portfolio(
+async def recommend_portfolio(
     request: schemas.InvestmentRequest,
-    db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
     # Temporary profile object
@@ -140,41 +393,88 @@ def recommend_portfolio(
     
     try:
         # Pass the new fields: target_amount and time_horizon_years
-        portfolio = recommendation_engine.generate_portfolio(
+        portfolio = await run_in_threadpool(
+            recommendation_engine.generate_portfolio,
             profile, 
             request.investable_amount,
             request.target_amount,
-            request.time_horizon_years
+            request.time_horizon_years,
+            request.simulate
         )
         return portfolio
     except Exception as e:
         return {"error": str(e)}
     
+@app.post("/recommend/solve")
+async def solve_goal(
+    request: schemas.GoalSolveRequest,
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    # Pure arithmetic (no upstream lookups), cheap enough for the event loop
+    rate = request.rate
+    if rate is None:
+        rate = recommendation_engine.EXPECTED_RETURN_RATES.get(request.risk_appetite.lower())
+        if rate is None:
+            raise HTTPException(status_code=400, detail="risk_appetite must be low, medium or high")
+    try:
+        return recommendation_engine.solve_goal(
+            request.target_amount, rate,
+            investable_amount=request.investable_amount,
+            time_horizon_years=request.time_horizon_years,
+            amounts=request.amounts, horizons=request.horizons, rates=request.rates,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/funds/search")
+async def search_funds(
+    q: str = "",
+    category: Optional[str] = None, # One of the catalog keywords, e.g. "Flexi Cap"
+    limit: int = 20,
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    # Served from the local catalog, no upstream call
+    return mf_catalog.catalog.search(q, category=category, limit=max(1, min(limit, 100)))
+
+@app.post("/funds/sync")
+async def sync_funds(current_user: models.User = Depends(auth.get_current_user)):
+    # Bulk refresh of the whole catalog; the background job does the same periodically.
+    # It re-runs every upstream search, so it is throttled catalog-wide.
+    catalog = mf_catalog.catalog
+    wait = (catalog.synced_at or 0) + mf_catalog.MF_SYNC_MIN_INTERVAL - time.time()
+    if wait > 0:
+        raise HTTPException(status_code=429, detail="Catalog was synced recently",
+                            headers={"Retry-After": str(int(wait) + 1)})
+    result = await run_in_threadpool(catalog.sync, None, False)
+    if result is None:
+        raise HTTPException(status_code=409, detail="A catalog sync is already running")
+    return result
+
 @app.delete("/assets/{asset_id}")
-def delete_asset(
+async def delete_asset(
     asset_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
     # Find the asset
-    asset = db.query(models.Asset).filter(models.Asset.id == asset_id, models.Asset.user_id == current_user.id).first()
+    asset = await crud_async.get_asset(db, asset_id=asset_id, user_id=current_user.id)
     
     if not asset:
         raise HTTPException(status_code=404, detail="Asset not found")
     
-    db.delete(asset)
-    db.commit()
+    await db.delete(asset)
+    await db.commit()
     return {"message": "Asset deleted successfully"}
     
 @app.put("/assets/{asset_id}")
-def update_asset(
+async def update_asset(
     asset_id: int,
     asset_update: schemas.AssetCreate, # Re-using AssetCreate schema since fields are same
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
     # 1. Find the asset
-    db_asset = db.query(models.Asset).filter(models.Asset.id == asset_id, models.Asset.user_id == current_user.id).first()
+    db_asset = await crud_async.get_asset(db, asset_id=asset_id, user_id=current_user.id)
     
     if not db_asset:
         raise HTTPException(status_code=404, detail="Asset not found")
@@ -185,31 +485,35 @@ def update_asset(
     db_asset.buy_price = asset_update.buy_price
     db_asset.asset_type = asset_update.asset_type
     
-    db.commit()
-    db.refresh(db_asset)
+    await db.commit()
+    await db.refresh(db_asset)
     return db_asset
 
 # --- 1. SHARED HELPER FUNCTION (No 'Depends' here!) ---
 def calculate_portfolio_summary(assets):
     """
     Accepts a list of asset objects.
-    Fetches live prices and calculates totals + individual asset performance.
+    Uses the prices stored by the background refresher, fetches only the
+    stale ones, and calculates totals + individual asset performance.
     """
     total_invested = 0.0
     total_current_value = 0.0
     
-    # 1. Get Live Prices (Batch fetch is better)
-    symbols = [asset.symbol for asset in assets]
-    
-    # Check if 'finance' module is imported and works, otherwise empty dict
-    # Assuming you have: import finance
+    # 1. Get Prices (stored price if fresh, otherwise batch fetch)
     live_prices = {}
-    if symbols:
+    stale_symbols = []
+    for asset in assets:
+        if price_refresher.is_fresh(asset):
+            live_prices[asset.symbol] = asset.current_price
+        else:
+            stale_symbols.append(asset.symbol)
+
+    if stale_symbols:
         try:
-            live_prices = finance.get_live_prices(symbols)
+            with metrics.timed("quotes"):
+                live_prices.update(finance.get_cached_prices(stale_symbols))
         except Exception as e:
             print(f"Error fetching prices: {e}")
-            live_prices = {}
 
     processed_assets = []
 
@@ -252,21 +556,42 @@ def calculate_portfolio_summary(assets):
         "holdings": processed_assets # returning the list here saves work later
     }
 
+def refresh_asset_prices(assets):
+    """
+    Live-fetches quotes for the given assets and writes them to the database,
+    so the summary (and every later read) values them at the fresh prices.
+    Blocking (quote fetch + sync session), so call it via run_in_threadpool.
+    """
+    symbols = list({asset.symbol for asset in assets})
+    db = SessionLocal()
+    try:
+        price_refresher.refresh_symbols(db, symbols)
+    except Exception as e:
+        db.rollback()
+        print(f"Error refreshing prices: {e}")
+    finally:
+        db.close()
+
 
 # --- 2. PORTFOLIO ENDPOINT ---
 @app.get("/portfolio/performance")
-def get_portfolio_performance(
-    db: Session = Depends(get_db),
+async def get_portfolio_performance(
+    refresh: bool = False, # Force a live quote fetch instead of stored prices
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
     # 1. Get Assets
-    assets = crud.get_assets(db, user_id=current_user.id)
+    assets = await crud_async.get_assets(db, user_id=current_user.id)
     
     if not assets:
         return {"total_portfolio_value": 0, "holdings": []}
     
     # 2. Use Helper
-    stats = calculate_portfolio_summary(assets)
+    if refresh:
+        await run_in_threadpool(refresh_asset_prices, assets)
+        db.expire_all()
+        assets = await crud_async.get_assets(db, user_id=current_user.id) # Reload the rows in one query
+    stats = await run_in_threadpool(calculate_portfolio_summary, assets)
 
     # 3. Return formatted response
     # The helper already did the hard work of building the 'holdings' list
@@ -280,20 +605,23 @@ def get_portfolio_performance(
 
 # --- 3. DASHBOARD ENDPOINT ---
 @app.get("/dashboard")
-def get_dashboard_stats(
-    db: Session = Depends(get_db),
+async def get_dashboard_stats(
+    refresh: bool = False, # Force a live quote fetch instead of stored prices
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
     # 1. Fetch Assets
-    assets = crud.get_assets(db, user_id=current_user.id)
+    assets = await crud_async.get_assets(db, user_id=current_user.id)
 
     # 2. Use Helper
-    stats = calculate_portfolio_summary(assets)
+    if refresh:
+        await run_in_threadpool(refresh_asset_prices, assets)
+        db.expire_all()
+        assets = await crud_async.get_assets(db, user_id=current_user.id) # Reload the rows in one query
+    stats = await run_in_threadpool(calculate_portfolio_summary, assets)
 
     # 3. Activity Count (Predictions)
-    active_count = db.query(models.Prediction).filter(
-        models.Prediction.user_id == current_user.id
-    ).count()
+    active_count = await crud_async.count_predictions(db, user_id=current_user.id)
 
     # 4. Return Data
     return {
@@ -307,6 +635,27 @@ def get_dashboard_stats(
             {"name": "Current Value", "value": stats["current_value"]}
         ]
     }
+
+@app.get("/quotes/cache")
+async def get_quote_cache_stats():
+    return finance.quote_cache.stats()
+
+@app.get("/funds/catalog")
+async def get_fund_catalog_stats():
+    return mf_catalog.catalog.stats()
+
+@app.get("/chat/cache")
+async def get_ai_cache_stats():
+    return ai.response_cache.stats()
+
+@app.get("/users/cache")
+async def get_user_cache_stats():
+    return auth.user_cache.stats()
+
+@app.get("/predict/cache")
+async def get_model_cache_stats():
+    return ml_engine.model_cache.stats()
+
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "Welcome to the AI Finance Assistant API!"}
\ No newline at end of file
@@ -0,0 +1,166 @@
+"""
+Request and stage timing.
+
+Every request is timed as a whole, and the main stages inside it (auth
+lookup, DB queries, upstream HTTP per host, ML fit, LLM call) are timed with
+`timed(stage, target)`. Durations go into Prometheus-style histograms served
+on /metrics, and the per-request totals can also be sent back in a
+Server-Timing header.
+
+Recording a sample is a dict lookup and a bisect under a lock, so it is
+cheap enough to leave on in production.
+"""
+import os
+import time
+import bisect
+import threading
+import contextvars
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"
+
+# Seconds. Covers cached lookups (~1 ms) up to slow LLM calls.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """
+    Minimal Prometheus histogram with a fixed set of label names.
+    """
+
+    def __init__(self, name, documentation, label_names, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., overflow, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 3)
+            # Non-cumulative here, summed up in render(). Values above the last
+            # bucket land in the overflow slot, which only +Inf (the count) covers
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+
+        for label_values, series in sorted(snapshot.items()):
+            labels = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.label_names, label_values))
+            prefix = labels + "," if labels else ""
+
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{{{labels}}} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{labels}}} {series[-1]}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending the response headers.",
+    ("method", "route", "status"),
+)
+stage_duration = Histogram(
+    "request_stage_duration_seconds",
+    "Time spent in one stage of request handling (auth, db, upstream, ml_fit, llm).",
+    ("stage", "target"),
+)
+
+# --- Per-request accumulation (for Server-Timing) ---
+
+# {stage: [total seconds, count]} for the request being handled, if any.
+# Sync endpoints run in a threadpool that copies the context, so they see
+# (and add to) the same dict. Work handed to our own executors is still
+# recorded in the histograms, only not in the header.
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def record(stage, seconds, target=""):
+    if not METRICS_ENABLED:
+        return
+    stage_duration.observe(seconds, stage, target)
+
+    timings = _request_timings.get()
+    if timings is not None:
+        entry = timings.setdefault(stage, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+
+@contextmanager
+def timed(stage, target=""):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start, target)
+
+
+def upstream(url):
+    """
+    timed() for an outbound HTTP call, labelled with the host.
+    """
+    return timed("upstream", urlparse(url).netloc)
+
+
+def start_request():
+    timings = {}
+    return timings, _request_timings.set(timings)
+
+
+def end_request(token):
+    _request_timings.reset(token)
+
+
+def server_timing_header(timings, total):
+    parts = [f"{stage};dur={seconds * 1000:.1f};desc=\"{count}x\"" for stage, (seconds, count) in timings.items()]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+# --- DB timing ---
+
+def instrument_engine(engine):
+    """
+    Times every statement executed through a SQLAlchemy engine as stage "db".
+    """
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("query_start")
+        if starts:
+            record("db", time.perf_counter() - starts.pop(), engine.dialect.name)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        starts = context.connection.info.get("query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+
+def render():
+    lines = request_duration.render() + stage_duration.render()
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,287 @@
+"""
+Local mutual fund catalog.
+
+Funds found through the IndianAPI /mutual_fund search are kept in a JSON
+file on disk and indexed in memory by category keyword and by name token,
+so recommendations and fund search never wait on the network. A background
+job re-runs the keyword searches periodically and updates NAVs in place.
+"""
+import os
+import re
+import json
+import time
+import bisect
+import threading
+import requests
+from dotenv import load_dotenv
+import metrics
+
+load_dotenv()
+
+# --- Configuration ---
+API_KEY = os.getenv("INDIAN_API_KEY")
+API_BASE_URL = os.getenv("INDIAN_API_BASE_URL", "https://stock.indianapi.in")
+MF_BASE_URL = f"{API_BASE_URL}/mutual_fund"
+MF_CATALOG_PATH = os.getenv("MF_CATALOG_PATH", os.path.join(os.path.dirname(__file__), "data", "mf_catalog.json"))
+MF_CATALOG_REFRESH_ENABLED = os.getenv("MF_CATALOG_REFRESH_ENABLED", "true").lower() == "true"
+MF_CATALOG_REFRESH_INTERVAL = int(os.getenv("MF_CATALOG_REFRESH_INTERVAL", "21600"))  # Seconds between syncs (6h)
+MF_SEARCH_TIMEOUT = float(os.getenv("MF_SEARCH_TIMEOUT", "10"))
+MF_SYNC_MIN_INTERVAL = int(os.getenv("MF_SYNC_MIN_INTERVAL", "900"))  # Min seconds between on-demand syncs
+
+# Category searches used by the recommendation engine, per risk profile
+RISK_KEYWORDS = {
+    "low": ["Liquid", "Conservative Hybrid", "Corporate Bond"],
+    "medium": ["Nifty 50 Index", "Flexi Cap", "Large & Mid Cap"],
+    "high": ["Small Cap", "Mid Cap", "Momentum"],
+}
+SYNC_KEYWORDS = [keyword for keywords in RISK_KEYWORDS.values() for keyword in keywords]
+
+
+def tokenize(text):
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def parse_funds(data):
+    """
+    /mutual_fund response -> [{"name", "nav"}] for funds with a usable NAV.
+    """
+    # Handle list vs dict response structure
+    funds = data if isinstance(data, list) else data.get("datasets", [])
+    parsed = []
+    for f in funds:
+        name = f.get("schemeName") or f.get("fundName") or f.get("name")
+        nav = f.get("nav") or f.get("currentNav") or f.get("price")
+        try:
+            nav = float(nav) if nav else 0.0
+        except (TypeError, ValueError):
+            continue
+        if name and nav > 0:
+            parsed.append({"name": name.strip(), "nav": nav})
+    return parsed
+
+
+def search_api(keyword):
+    """
+    One live /mutual_fund search. Raises on network or HTTP errors.
+    """
+    with metrics.upstream(MF_BASE_URL):
+        response = requests.get(MF_BASE_URL, params={"name": keyword}, headers={"X-Api-Key": API_KEY},
+                                timeout=MF_SEARCH_TIMEOUT)
+    response.raise_for_status()
+    return parse_funds(response.json())
+
+
+class FundCatalog:
+    """
+    Funds keyed by lower-cased name, persisted as one JSON file.
+
+    The indexes are rebuilt after every change and swapped in as a whole,
+    so readers never lock and never see a half-updated index.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()       # Guards changes to the funds and the file
+        self._sync_lock = threading.Lock()  # One sync at a time
+        self.synced_at = None
+        self._set_funds({})
+        self.load()
+
+    # --- Storage ---
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"MF catalog: could not read {self.path}: {e}")
+            return
+        self.synced_at = data.get("synced_at")
+        self._set_funds({fund["name"].lower(): fund for fund in data.get("funds", [])})
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Under the lock: one writer at a time, and the snapshot matches the file.
+        # Write-then-rename so readers never see a half-written file.
+        with self._lock:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"synced_at": self.synced_at, "funds": list(self.funds.values())}, f)
+            os.replace(tmp_path, self.path)
+
+    # --- Index ---
+
+    def _set_funds(self, funds):
+        by_token, by_keyword = {}, {}
+        for key, fund in funds.items():
+            for token in set(tokenize(fund["name"])):
+                by_token.setdefault(token, []).append(key)
+            for keyword in fund["keywords"]:
+                by_keyword.setdefault(keyword.lower(), []).append(key)
+
+        # A single assignment, so readers pick up all four together
+        self._index = (funds, by_token, sorted(by_token), by_keyword)
+
+    @property
+    def funds(self):
+        return self._index[0]
+
+    def upsert(self, keyword, funds, now=None):
+        """
+        Merges one search result: updates NAVs of known funds, adds new ones
+        and tags them with `keyword`. Returns (added, updated).
+        """
+        now = now or time.time()
+        added = updated = 0
+        with self._lock:
+            merged = dict(self.funds)
+            for fund in funds:
+                key = fund["name"].lower()
+                existing = merged.get(key)
+                if existing is None:
+                    merged[key] = {"name": fund["name"], "nav": fund["nav"], "keywords": [keyword], "nav_updated_at": now}
+                    added += 1
+                    continue
+                entry = dict(existing)
+                if keyword not in entry["keywords"]:
+                    entry["keywords"] = entry["keywords"] + [keyword]
+                if entry["nav"] != fund["nav"]:
+                    entry["nav"] = fund["nav"]
+                    entry["nav_updated_at"] = now
+                    updated += 1
+                merged[key] = entry
+            self._set_funds(merged)
+        return added, updated
+
+    # --- Queries (no network) ---
+
+    def by_keyword(self, keyword):
+        funds, _, _, by_keyword = self._index
+        return [funds[key] for key in by_keyword.get(keyword.lower(), [])]
+
+    def search(self, query="", category=None, limit=20):
+        """
+        Funds whose name has every query token as a word prefix
+        ("hdfc flex" matches "HDFC Flexi Cap Fund"), optionally restricted to
+        one category keyword. Ordered by name.
+        """
+        funds, by_token, vocabulary, by_keyword = self._index
+        matches = None
+        if category:
+            matches = set(by_keyword.get(category.lower(), []))
+
+        for token in tokenize(query):
+            # All vocabulary words starting with `token` sit next to each other
+            start = bisect.bisect_left(vocabulary, token)
+            keys = set()
+            for word in vocabulary[start:]:
+                if not word.startswith(token):
+                    break
+                keys.update(by_token[word])
+            matches = keys if matches is None else matches & keys
+            if not matches:
+                return []
+
+        keys = funds.keys() if matches is None else matches
+        return [funds[key] for key in sorted(keys)[:limit]]
+
+    def stats(self):
+        funds, by_token, _, by_keyword = self._index
+        return {
+            "funds": len(funds),
+            "tokens": len(by_token),
+            "keywords": sorted(by_keyword),
+            "synced_at": self.synced_at,
+            "syncing": self.syncing,
+            "path": self.path,
+        }
+
+    # --- Sync ---
+
+    @property
+    def syncing(self):
+        return self._sync_lock.locked()
+
+    def sync(self, keywords=None, wait=True):
+        """
+        Re-runs the keyword searches against the API and merges the results.
+        A failed keyword keeps its previous funds. Returns per-run counts,
+        or None if another sync is running and `wait` is False.
+        """
+        if not self._sync_lock.acquire(blocking=wait):
+            return None
+        try:
+            return self._sync(keywords)
+        finally:
+            self._sync_lock.release()
+
+    def _sync(self, keywords):
+        added = updated = failed = 0
+        for keyword in keywords or SYNC_KEYWORDS:
+            try:
+                a, u = self.upsert(keyword, search_api(keyword))
+                added, updated = added + a, updated + u
+            except Exception as e:
+                failed += 1
+                print(f"MF catalog: sync of '{keyword}' failed: {e}")
+
+        self.synced_at = time.time()
+        self.save()
+        print(f"MF catalog: {added} added, {updated} NAVs updated, {failed} keywords failed, {len(self.funds)} funds")
+        return {"added": added, "updated": updated, "failed": failed, "funds": len(self.funds)}
+
+    def ensure_keyword(self, keyword):
+        """
+        Funds for `keyword`, searching the API once if the catalog has none yet
+        (e.g. a fresh install before the first sync).
+        """
+        funds = self.by_keyword(keyword)
+        if funds:
+            return funds
+        try:
+            self.upsert(keyword, search_api(keyword))
+            self.save()
+        except Exception as e:
+            print(f"MF API Error: {e}")
+        return self.by_keyword(keyword)
+
+
+class CatalogRefresher:
+    """
+    Background thread that keeps the catalog's NAVs up to date.
+    """
+
+    def __init__(self, catalog, interval):
+        self.catalog = catalog
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="mf-catalog-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        # A catalog synced recently (e.g. before a restart) is not re-synced right away
+        synced_at = self.catalog.synced_at or 0
+        self._stop.wait(max(0, synced_at + self.interval - time.time()))
+        while not self._stop.is_set():
+            try:
+                self.catalog.sync()
+            except Exception as e:
+                print(f"MF catalog refresher error: {e}")
+            self._stop.wait(self.interval)
+
+
+catalog = FundCatalog(MF_CATALOG_PATH)
+refresher = CatalogRefresher(catalog, MF_CATALOG_REFRESH_INTERVAL)
@@ -3,9 +3,17 @@ import pandas as pd
 import numpy as np
 import requests
 import os
-from sklearn.linear_model import LinearRegression
+import time
 from dotenv import load_dotenv
 import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from history_store import HistoryStore, bars_to_frame, fill_missing
+from regression import fit_least_squares
+from cache import TTLCache
+import metrics
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -17,7 +25,33 @@ API_KEY = os.getenv("INDIAN_API_KEY")
 if not API_KEY:
     raise ValueError("INDIAN_API_KEY not found in environment variables. Please set it in your .env file.")
 
-BASE_URL = "https://stock.indianapi.in"
+BASE_URL = os.getenv("INDIAN_API_BASE_URL", "https://stock.indianapi.in")
+
+# Local OHLCV store (see history_store.py)
+HISTORY_STORE_DIR = os.getenv("HISTORY_STORE_DIR", os.path.join(os.path.dirname(__file__), "data", "history"))
+HISTORY_SYNC_INTERVAL = int(os.getenv("HISTORY_SYNC_INTERVAL", "21600"))  # Seconds before re-syncing a symbol
+history_store = HistoryStore(HISTORY_STORE_DIR)
+
+# Trading days kept for each user-facing period
+PERIOD_MAP = {"1mo": 22, "3mo": 66, "6mo": 132, "1yr": 252, "7d": 7}
+
+# Upstream calls that run alongside each other inside one prediction
+IO_POOL_WORKERS = int(os.getenv("IO_POOL_WORKERS", "16"))
+FUNDAMENTALS_DEADLINE = float(os.getenv("FUNDAMENTALS_DEADLINE", "4"))  # Seconds before giving up on fundamentals
+io_pool = ThreadPoolExecutor(max_workers=IO_POOL_WORKERS, thread_name_prefix="ml-io")
+
+# Full per-symbol series with period-independent indicators, see load_series()
+SERIES_CACHE_SIZE = int(os.getenv("SERIES_CACHE_SIZE", "256"))
+series_cache = TTLCache(ttl=None, maxsize=SERIES_CACHE_SIZE, name="series")
+INDICATOR_COLUMNS = {'RSI', 'EMA_9', 'EMA_21', 'Volatility'}
+
+# Fitted models + signals keyed by (symbol, period, last bar)
+MODEL_CACHE_SIZE = int(os.getenv("MODEL_CACHE_SIZE", "512"))
+MODEL_CACHE_TTL = int(os.getenv("MODEL_CACHE_TTL", "86400"))  # Fundamentals are re-read at least daily
+model_cache = TTLCache(ttl=MODEL_CACHE_TTL, maxsize=MODEL_CACHE_SIZE, name="models")
+
+def normalize_symbol(symbol):
+    return symbol.replace(".NS", "").replace(".BO", "").upper()
 
 def fetch_company_fundamentals(symbol):
     """
@@ -32,7 +66,8 @@ def fetch_company_fundamentals(symbol):
     headers = {"X-Api-Key": API_KEY}
     
     try:
-        response = requests.get(url, params=params, headers=headers, timeout=10)
+        with metrics.upstream(url):
+            response = requests.get(url, params=params, headers=headers, timeout=10)
         if response.status_code == 200:
             return response.json()
         else:
@@ -45,23 +80,23 @@ def fetch_company_fundamentals(symbol):
         logger.error(f"Unexpected error fetching fundamentals for {symbol}: {e}")
         return None
 
-def fetch_historical_data(symbol, period="1yr"):
+def download_historical_data(symbol, period="1yr"):
     """
-    Fetches 1 Year of data safely and slices it locally.
+    Downloads daily bars from the API and normalises the columns.
     """
     clean_symbol = symbol.replace(".NS", "").replace(".BO", "")
     
-    # Always fetch 1yr to ensure technical indicators (EMA, RSI) have enough data
     url = f"{BASE_URL}/historical_data"
     params = {
         "stock_name": clean_symbol,
-        "period": "1yr", 
+        "period": period, 
         "filter": "default"
     }
     headers = {"X-Api-Key": API_KEY}
 
     try:
-        response = requests.get(url, params=params, headers=headers, timeout=10)
+        with metrics.upstream(url):
+            response = requests.get(url, params=params, headers=headers, timeout=10)
         if response.status_code == 200:
             data = response.json()
             if "datasets" in data and len(data["datasets"]) > 0:
@@ -99,13 +134,6 @@ def fetch_historical_data(symbol, period="1yr"):
                     logger.warning(f"All data was NaN for {symbol}")
                     return None
 
-                # Slice Data Locally based on User Period
-                period_map = {"1mo": 22, "3mo": 66, "6mo": 132, "1yr": 252, "7d": 7}
-                rows_to_keep = period_map.get(period, 252)
-                
-                if len(df) > rows_to_keep:
-                    df = df.tail(rows_to_keep)
-                    
                 return df
             else:
                 logger.warning(f"No datasets found for {symbol}")
@@ -120,27 +148,125 @@ def fetch_historical_data(symbol, period="1yr"):
         logger.error(f"Unexpected error fetching historical data for {symbol}: {e}")
         return None
 
+def history_is_fresh(meta):
+    return meta is not None and time.time() - meta["synced_at"] < HISTORY_SYNC_INTERVAL
+
+def sync_history(symbol):
+    """
+    Brings the local store up to date for a symbol.
+    Fresh symbols are not touched; otherwise only the bars since the last
+    sync are downloaded (a short window) and appended.
+    """
+    clean_symbol = normalize_symbol(symbol)
+    bars, meta = history_store.read(clean_symbol)
+
+    if history_is_fresh(meta):
+        return True
+
+    # Always keep 1yr locally to ensure technical indicators (EMA, RSI) have enough data
+    upstream_period = "1yr"
+    last_date = history_store.last_date(clean_symbol)
+    if last_date is not None and (pd.Timestamp.now() - last_date).days <= 25:
+        upstream_period = "1m"
+
+    df = download_historical_data(clean_symbol, upstream_period)
+    if df is None:
+        # Serve stale bars rather than nothing if the API is down
+        return bars is not None
+
+    try:
+        added = history_store.append(clean_symbol, df)
+    except Exception as e:
+        logger.error(f"Could not store history for {symbol}: {e}")
+        return bars is not None
+
+    if added == 0:
+        history_store.touch(clean_symbol)
+    return True
+
+def load_series(symbol):
+    """
+    Full stored history of a symbol (downloaded once, see sync_history) with
+    the indicators that do not depend on the period's start -- Volatility and
+    RSI -- computed once over the whole series.
+    Kept in memory until the store is synced again.
+    """
+    if not sync_history(symbol):
+        return None
+
+    clean_symbol = normalize_symbol(symbol)
+    bars, meta = history_store.read(clean_symbol)
+    if bars is None or len(bars) == 0:
+        logger.warning(f"No stored history for {symbol}")
+        return None
+
+    key = (clean_symbol, meta["synced_at"])
+    series = series_cache.get(key)
+    if series is None:
+        # Stores written before fill_missing may still hold NaN volumes/highs;
+        # only bars without a date or close are unusable
+        series = bars_to_frame(fill_missing(bars), meta["columns"])
+        series = series.dropna(subset=["Date", "Close"]).reset_index(drop=True)
+        series['Volatility'] = compute_volatility(series)
+        series['RSI'] = compute_rsi(series['Close'])
+        series_cache.set(key, series)
+    return series
+
+def period_indicators(series, period):
+    """
+    Slice of a load_series() frame for one period, with the same indicator
+    values calculate_technical_indicators() would give on that slice alone.
+    Volatility and most of RSI are reused from the full series; only the
+    EMAs (seeded at the slice start) and the first RSI bar are recomputed.
+    Warm-up rows keep NaN RSI; analyze_prediction drops them like before.
+    """
+    rows_to_keep = PERIOD_MAP.get(period, 252)
+    df = series.iloc[-rows_to_keep:]
+    n = len(df)
+
+    # RSI: a 14-bar window that lies fully inside the slice matches the full
+    # series. The first window differs (its first diff is 0 in the slice).
+    if n >= 14:
+        rsi = df['RSI'].to_numpy().copy()
+        rsi[:13] = np.nan
+        if n < len(series):
+            rsi[13] = compute_rsi(df['Close'].iloc[:14]).iloc[-1]
+    else:
+        rsi = 50  # Neutral if insufficient data
+
+    return df.assign(
+        RSI=rsi,
+        EMA_9=df['Close'].ewm(span=9, adjust=False).mean() if n >= 9 else df['Close'],
+        EMA_21=df['Close'].ewm(span=21, adjust=False).mean() if n >= 21 else df['Close'],
+    )
+
+def compute_volatility(df):
+    # Volatility (High - Low)
+    if 'High' in df.columns and 'Low' in df.columns:
+        return df['High'] - df['Low']
+    return df['Close'] * 0.01  # Fallback: 1% of close
+
+def compute_rsi(close):
+    delta = close.diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    
+    # Prevent division by zero
+    loss = loss.replace(0, 0.001)
+    
+    rs = gain / loss
+    return 100 - (100 / (1 + rs))
+
 def calculate_technical_indicators(df):
     """
     Calculates RSI, EMA, and Volatility.
     """
     # 1. Volatility (High - Low)
-    if 'High' in df.columns and 'Low' in df.columns:
-        df['Volatility'] = df['High'] - df['Low']
-    else:
-        df['Volatility'] = df['Close'] * 0.01  # Fallback: 1% of close
+    df['Volatility'] = compute_volatility(df)
     
     # 2. RSI
     if len(df) >= 14:
-        delta = df['Close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        
-        # Prevent division by zero
-        loss = loss.replace(0, 0.001)
-        
-        rs = gain / loss
-        df['RSI'] = 100 - (100 / (1 + rs))
+        df['RSI'] = compute_rsi(df['Close'])
     else:
         df['RSI'] = 50  # Neutral if insufficient data
 
@@ -219,46 +345,106 @@ def predict_intraday(symbol, period="1yr"):
     """
     Main prediction function combining technical and fundamental analysis.
     """
-    # 1. Fetch Technical Data (Price History)
-    df = fetch_historical_data(symbol, period)
+    deadline = time.monotonic() + FUNDAMENTALS_DEADLINE
+    fundamentals_future = None
+
+    # If the history has to come from the API, download fundamentals alongside it
+    if not history_is_fresh(history_store.read(normalize_symbol(symbol))[1]):
+        fundamentals_future = io_pool.submit(fetch_company_fundamentals, symbol)
+
+    # 1. Fetch Technical Data (Price History + indicators shared across periods)
+    series = load_series(symbol)
+    df = None if series is None else period_indicators(series, period)
+
+    # Same symbol, period and last bar -> same answer; skip fundamentals and the fit
+    key = model_cache_key(symbol, period, df)
+    cached = model_cache.get(key) if key else None
+    if cached:
+        return dict(cached["result"])
     
     # 2. Fetch Fundamental Data (Analyst Ratings)
-    fundamentals = fetch_company_fundamentals(symbol)
+    if fundamentals_future is None:
+        fundamentals_future = io_pool.submit(fetch_company_fundamentals, symbol)
+    fundamentals = wait_for_fundamentals(fundamentals_future, symbol, deadline)
     
+    result, model_state = analyze_prediction(symbol, period, df, fundamentals)
+    remember_prediction(key, result, model_state, fundamentals)
+    return result
+
+def wait_for_fundamentals(future, symbol, deadline):
+    """
+    Waits for a fundamentals fetch until the deadline. A late answer is
+    treated like a failed one: the prediction goes out on technicals alone
+    and the fetch finishes in the background.
+    """
+    try:
+        return future.result(timeout=max(0.0, deadline - time.monotonic()))
+    except FuturesTimeoutError:
+        logger.warning(f"Fundamentals for {symbol} missed the {FUNDAMENTALS_DEADLINE}s deadline")
+        return None
+
+def model_cache_key(symbol, period, df):
+    """
+    (symbol, period, timestamp of the last bar). A newer bar changes the key,
+    so stale entries are never hit again and simply age out of the LRU.
+    """
+    if df is None or len(df) == 0 or 'Date' not in df.columns:
+        return None
+    clean_symbol = normalize_symbol(symbol)
+    return (clean_symbol, period, pd.Timestamp(df['Date'].iloc[-1]).isoformat())
+
+def remember_prediction(key, result, model_state, fundamentals):
+    # Errors and answers computed without fundamentals are not worth keeping
+    if key is None or model_state is None or fundamentals is None:
+        return
+    model_cache.set(key, {"model": model_state, "result": dict(result)})
+
+def analyze_prediction(symbol, period, df, fundamentals):
+    """
+    CPU stage of the prediction: indicators, model fit and decision logic.
+    Does no I/O, so it can run in a worker process.
+    Returns (result, model_state); model_state holds the fitted coefficients
+    and the last indicator row, or None if no model could be fitted.
+    """
     # --- SAFETY CHECKS ---
     if df is None or len(df) < 5:
-        return {"symbol": symbol, "error": f"Insufficient price data for {period}."}
+        return {"symbol": symbol, "error": f"Insufficient price data for {period}."}, None
 
     # --- TECHNICAL ANALYSIS (The Quant Model) ---
-    df = calculate_technical_indicators(df)
+    if INDICATOR_COLUMNS.issubset(df.columns):
+        df = df.dropna() # Already computed by period_indicators()
+    else:
+        df = calculate_technical_indicators(df)
     
     features = [f for f in ['Close', 'RSI', 'EMA_9', 'EMA_21', 'Volatility'] if f in df.columns]
     
     if not features:
-        return {"symbol": symbol, "error": "Could not calculate indicators."}
+        return {"symbol": symbol, "error": "Could not calculate indicators."}, None
 
     # Train Linear Regression
     df['Target'] = df['Close'].shift(-1)
     data_for_ml = df.dropna()
     
     if len(data_for_ml) < 2:
-        return {"symbol": symbol, "error": "Not enough data for ML training."}
+        return {"symbol": symbol, "error": "Not enough data for ML training."}, None
 
-    X = data_for_ml[features]
-    y = data_for_ml['Target']
+    X = data_for_ml[features].to_numpy()
+    y = data_for_ml['Target'].to_numpy()
     
-    model = LinearRegression()
-    model.fit(X, y)
+    with metrics.timed("ml_fit"):
+        model = fit_least_squares(X, y)
 
     # Predict
     last_row = df.iloc[[-1]][features]
-    predicted_price = model.predict(last_row)[0]
+    predicted_price = model.predict(last_row.to_numpy())[0]
     current_price = last_row['Close'].values[0]
     current_rsi = last_row['RSI'].values[0] if 'RSI' in last_row else 50
     atr = df['Volatility'].mean() if 'Volatility' in df else current_price * 0.01
 
     # --- FUNDAMENTAL ANALYSIS (The Hedge Fund Filter) ---
     analyst_score, analyst_sentiment = analyze_fundamentals(fundamentals)
+    if fundamentals is None:
+        analyst_sentiment = "UNAVAILABLE"  # Fetch failed or missed its deadline
 
     # --- FINAL "HEDGE FUND" DECISION LOGIC ---
     
@@ -301,7 +487,7 @@ def predict_intraday(symbol, period="1yr"):
         stop_loss = current_price - atr
         target = current_price + atr
 
-    return {
+    result = {
         "symbol": symbol.upper(),
         "period_analyzed": period,
         "current_price": round(float(current_price), 2),
@@ -314,3 +500,133 @@ def predict_intraday(symbol, period="1yr"):
         "analyst_score": round(analyst_score, 2)
     }
 
+    model_state = {
+        "features": features,
+        "coef": [float(c) for c in model.coef_],
+        "intercept": float(model.intercept_),
+        "last_row": {f: float(v) for f, v in last_row.iloc[0].items()},
+        "atr": float(atr),
+    }
+
+    return result, model_state
+
+# --- BATCH PREDICTION ---
+
+PREDICT_POOL_WORKERS = int(os.getenv("PREDICT_POOL_WORKERS", str(os.cpu_count() or 2)))
+BATCH_FETCH_WORKERS = int(os.getenv("BATCH_FETCH_WORKERS", "8"))
+MAX_BATCH_ITEMS = int(os.getenv("MAX_BATCH_ITEMS", "200"))  # symbols x periods per request
+
+_process_pool = None
+_pool_lock = threading.Lock()
+
+def get_process_pool():
+    """
+    Lazily created pool for the CPU-heavy stages. Uses 'spawn' so workers
+    never inherit locks held by the server's threads.
+    """
+    global _process_pool
+    with _pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=PREDICT_POOL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _process_pool
+
+def shutdown_process_pool():
+    global _process_pool
+    with _pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+            _process_pool = None
+
+def fetch_prediction_inputs(symbol, periods):
+    """
+    I/O stage for one symbol: history (loaded once and sliced per period,
+    with indicators), the cached answers, plus fundamentals.
+    Returns ({period: frame}, {period: cached result or None}, fundamentals).
+    The cache is read once here, so a later eviction cannot leave a period
+    without both its cached answer and the fundamentals to compute it.
+    """
+    deadline = time.monotonic() + FUNDAMENTALS_DEADLINE
+    fundamentals_future = None
+
+    # If the history has to come from the API, download fundamentals alongside it
+    if not history_is_fresh(history_store.read(normalize_symbol(symbol))[1]):
+        fundamentals_future = io_pool.submit(fetch_company_fundamentals, symbol)
+
+    series = load_series(symbol)
+    frames = {p: None if series is None else period_indicators(series, p) for p in periods}
+
+    cached = {}
+    for period, period_df in frames.items():
+        key = model_cache_key(symbol, period, period_df)
+        entry = model_cache.get(key) if key else None
+        cached[period] = dict(entry["result"]) if entry else None
+
+    # Fundamentals are only needed if some period is not cached
+    fundamentals = None
+    if any(result is None for result in cached.values()):
+        if fundamentals_future is None:
+            fundamentals_future = io_pool.submit(fetch_company_fundamentals, symbol)
+        fundamentals = wait_for_fundamentals(fundamentals_future, symbol, deadline)
+    return frames, cached, fundamentals
+
+def predict_batch(symbols, periods):
+    """
+    Generator yielding one prediction dict per (symbol, period) as soon as it
+    is ready. Fetches run concurrently on threads and the analysis of each
+    symbol is handed to the process pool as soon as its data arrives.
+    """
+    symbols = list(dict.fromkeys(s.strip().upper() for s in symbols if s.strip()))
+    periods = list(dict.fromkeys(periods)) or ["1yr"]
+
+    process_pool = get_process_pool()
+    fetch_pool = ThreadPoolExecutor(max_workers=max(1, min(BATCH_FETCH_WORKERS, len(symbols))))
+    pending = {}  # future -> (stage, symbol, period)
+    inputs = {}   # analysis future -> (cache key, fundamentals)
+
+    try:
+        for symbol in symbols:
+            future = fetch_pool.submit(fetch_prediction_inputs, symbol, periods)
+            pending[future] = ("fetch", symbol, None)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                stage, symbol, period = pending.pop(future)
+
+                if stage == "fetch":
+                    try:
+                        frames, cached, fundamentals = future.result()
+                    except Exception as e:
+                        logger.error(f"Batch fetch failed for {symbol}: {e}")
+                        for period in periods:
+                            yield {"symbol": symbol, "period_analyzed": period, "error": str(e)}
+                        continue
+
+                    for period in periods:
+                        if cached[period] is not None:
+                            yield cached[period]
+                            continue
+
+                        period_df = frames[period]
+                        key = model_cache_key(symbol, period, period_df)
+                        analysis = process_pool.submit(analyze_prediction, symbol, period, period_df, fundamentals)
+                        pending[analysis] = ("analyze", symbol, period)
+                        inputs[analysis] = (key, fundamentals)
+                else:
+                    try:
+                        result, model_state = future.result()
+                        key, fundamentals = inputs.pop(future)
+                        remember_prediction(key, result, model_state, fundamentals)
+                        yield result
+                    except Exception as e:
+                        logger.error(f"Batch prediction failed for {symbol} ({period}): {e}")
+                        yield {"symbol": symbol, "period_analyzed": period, "error": str(e)}
+    finally:
+        # Client went away or we finished: drop whatever has not started
+        for future in pending:
+            future.cancel()
+        fetch_pool.shutdown(wait=False, cancel_futures=True)
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.sql import func
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime
@@ -31,13 +32,46 @@ class Transaction(Base):
     amount = Column(Float, nullable=False)
     category = Column(String, nullable=False)
     type = Column(String, nullable=False)
-    date = Column(DateTime(timezone=True), server_default=func.now())
+    # On SQLite, store dates the way CURRENT_TIMESTAMP writes them (no
+    # microseconds) so bound cursor values compare correctly with stored ones
+    date = Column(
+        DateTime(timezone=True).with_variant(
+            sqlite.DATETIME(storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"),
+            "sqlite",
+        ),
+        server_default=func.now(),
+    )
     note = Column(String, nullable=True)
     
     user_id = Column(Integer, ForeignKey("users.id"))
     
     owner = relationship("User", back_populates="transactions")
 
+    # Serves the paginated history: WHERE user_id = ? ORDER BY date DESC, id DESC
+    __table_args__ = (
+        Index("ix_transactions_user_date_id", "user_id", "date", "id"),
+    )
+
+class TransactionSummary(Base):
+    """
+    Running totals per (user, month, category, type), kept up to date by
+    crud.add_to_summary and rebuildable from the transactions table.
+    """
+    __tablename__ = "transaction_summaries"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    month = Column(String(7), nullable=False) # 'YYYY-MM' (UTC)
+    category = Column(String, nullable=False)
+    type = Column(String, nullable=False)
+    total = Column(Float, nullable=False, default=0.0)
+    count = Column(Integer, nullable=False, default=0)
+
+    # Also the upsert conflict target, and serves WHERE user_id = ? AND month >= ?
+    __table_args__ = (
+        UniqueConstraint("user_id", "month", "category", "type", name="uq_transaction_summary_key"),
+    )
+
 class Asset(Base):
     __tablename__ = "assets"
 
@@ -46,6 +80,7 @@ class Asset(Base):
     quantity = Column(Float, nullable=False)
     buy_price = Column(Float, nullable=False)
     current_price = Column(Float, default=0.0) 
+    price_updated_at = Column(DateTime(timezone=True), nullable=True) # Set by the background price refresher
     asset_type = Column(String, nullable=False)
     
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -0,0 +1,138 @@
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import case, update
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+
+import models, finance
+from database import SessionLocal
+
+load_dotenv()
+
+# --- Configuration ---
+PRICE_REFRESH_ENABLED = os.getenv("PRICE_REFRESH_ENABLED", "true").lower() == "true"
+PRICE_REFRESH_INTERVAL = int(os.getenv("PRICE_REFRESH_INTERVAL", "300"))  # Seconds between refresh runs
+PRICE_REFRESH_BATCH = int(os.getenv("PRICE_REFRESH_BATCH", "200"))        # Symbols per UPDATE statement
+# Stored prices older than this are treated as stale by the valuation endpoints
+PRICE_MAX_AGE = int(os.getenv("PRICE_MAX_AGE", str(PRICE_REFRESH_INTERVAL * 2)))
+
+
+def get_tracked_symbols(db: Session):
+    """
+    Distinct symbols held by any user.
+    """
+    rows = db.query(models.Asset.symbol).distinct().all()
+    return [row[0] for row in rows]
+
+
+def store_prices(db: Session, prices: dict):
+    """
+    Writes quotes to every asset row holding those symbols.
+    One UPDATE ... CASE statement per batch instead of one per row.
+    Failed quotes (0.0) are skipped so a bad fetch never wipes a good price.
+    """
+    prices = {symbol: price for symbol, price in prices.items() if price and price > 0}
+    if not prices:
+        return 0
+
+    now = datetime.now(timezone.utc)
+    symbols = list(prices)
+    updated = 0
+
+    for i in range(0, len(symbols), PRICE_REFRESH_BATCH):
+        batch = {symbol: prices[symbol] for symbol in symbols[i:i + PRICE_REFRESH_BATCH]}
+
+        stmt = (
+            update(models.Asset)
+            .where(models.Asset.symbol.in_(list(batch)))
+            .values(
+                current_price=case(batch, value=models.Asset.symbol),
+                price_updated_at=now,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        updated += db.execute(stmt).rowcount
+        db.commit()
+
+    # Keep the request-path cache in step with what we just stored
+    for symbol, price in prices.items():
+        finance.quote_cache.set(symbol, price)
+
+    return updated
+
+
+def refresh_symbols(db: Session, symbols: list):
+    """
+    Fetches live quotes for the given symbols, stores them and returns them.
+    Used by the background loop and by endpoints that force a live refresh.
+    """
+    if not symbols:
+        return {}
+
+    prices = finance.get_live_prices(symbols)
+    store_prices(db, prices)
+    return prices
+
+
+def refresh_all_prices(db: Session):
+    symbols = get_tracked_symbols(db)
+    prices = refresh_symbols(db, symbols)
+    refreshed = sum(1 for price in prices.values() if price > 0)
+    print(f"Price refresher: updated {refreshed}/{len(symbols)} symbols")
+    return refreshed
+
+
+def is_fresh(asset, now=None):
+    """
+    True if the stored price was written by the refresher recently enough.
+    """
+    if not asset.current_price or asset.price_updated_at is None:
+        return False
+
+    updated_at = asset.price_updated_at
+    # SQLite hands back naive datetimes; everything we store is UTC
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+
+    now = now or datetime.now(timezone.utc)
+    return now - updated_at <= timedelta(seconds=PRICE_MAX_AGE)
+
+
+class PriceRefresher:
+    """
+    Background thread that keeps Asset.current_price up to date.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="price-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        while not self._stop.is_set():
+            db = SessionLocal()
+            try:
+                refresh_all_prices(db)
+            except Exception as e:
+                db.rollback()
+                print(f"Price refresher error: {e}")
+            finally:
+                db.close()
+
+            self._stop.wait(self.interval)
+
+
+refresher = PriceRefresher(PRICE_REFRESH_INTERVAL)
@@ -1,18 +1,50 @@
-import pandas as pd
 import requests
 import os
+import csv
+import bisect
+import threading
 import random
 import math
+import numpy as np
 from dotenv import load_dotenv
+import metrics
+import mf_catalog
 
 load_dotenv()
 
 # --- Configuration ---
 API_KEY = os.getenv("INDIAN_API_KEY")
-STOCK_BASE_URL = "https://stock.indianapi.in/stock"
-MF_BASE_URL = "https://stock.indianapi.in/mutual_fund"
+API_BASE_URL = os.getenv("INDIAN_API_BASE_URL", "https://stock.indianapi.in")
+STOCK_BASE_URL = f"{API_BASE_URL}/stock"
 CSV_PATH = os.path.join(os.path.dirname(__file__), "data", "fd_rd_rates.csv")
 
+# --- Monte Carlo projection ---
+MONTE_CARLO_PATHS = int(os.getenv("MONTE_CARLO_PATHS", "10000"))
+MONTE_CARLO_MAX_STEPS = int(os.getenv("MONTE_CARLO_MAX_STEPS", "1200000")) # paths x months; 10k paths up to 10 years
+MONTE_CARLO_SEED = int(os.getenv("MONTE_CARLO_SEED", "42")) # Fixed, so the same plan always shows the same odds
+PROJECTION_PERCENTILES = (10, 25, 50, 75, 90)
+
+# (annual expected return, annual volatility) per sleeve and risk profile.
+# Blended with the RD rate at each profile's split, the means give back the
+# expected_return_rate used by the deterministic projection.
+RETURN_ASSUMPTIONS = {
+    "low":    {"mf": (0.080, 0.05), "equity": (0.100, 0.18)},
+    "medium": {"mf": (0.120, 0.15), "equity": (0.135, 0.22)},
+    "high":   {"mf": (0.150, 0.22), "equity": (0.165, 0.32)},
+}
+EQUITY_CORRELATION = 0.8 # Between the MF and direct equity sleeves
+
+# Expected annual return (%) of each profile's RD/MF/equity mix
+EXPECTED_RETURN_RATES = {"low": 7.5, "medium": 10.5, "high": 14.0}
+
+# --- Goal solver ---
+MAX_GRID_CELLS = 20000
+MAX_SOLVE_AMOUNT = 1e12
+MAX_SOLVE_YEARS = 100
+SOLVE_RATE_RANGE = (-50.0, 50.0) # Annual %; the formula needs rates above -100
+DEFAULT_GRID_HORIZONS = [1, 2, 3, 5, 7, 10, 15, 20, 25, 30]
+DEFAULT_GRID_AMOUNT_STEPS = [0.5, 0.75, 1.0, 1.25, 1.5, 2.0] # Multiples of the given/solved monthly amount
+
 def get_live_stock_price(symbol):
     """
     Fetches live stock price to calculate how many units the user can buy monthly.
@@ -24,7 +56,8 @@ def get_live_stock_price(symbol):
         params = {"name": symbol_query}
         headers = {"X-Api-Key": API_KEY}
         
-        response = requests.get(STOCK_BASE_URL, params=params, headers=headers)
+        with metrics.upstream(STOCK_BASE_URL):
+            response = requests.get(STOCK_BASE_URL, params=params, headers=headers)
         
         if response.status_code == 200:
             data = response.json()
@@ -43,53 +76,29 @@ def get_live_stock_price(symbol):
 
 def get_mutual_fund_recommendation(risk_profile):
     """
-    Searches IndianAPI for a mutual fund suitable for the risk profile 
-    and returns its live NAV.
+    Picks a mutual fund suitable for the risk profile from the local
+    catalog (see mf_catalog.py) and returns its stored NAV.
     """
     # 1. Select Search Keywords based on Risk
     if risk_profile == "low":
-        keywords = ["Liquid", "Conservative Hybrid", "Corporate Bond"]
         category_desc = "Low Risk / Debt Scheme"
     elif risk_profile == "medium":
-        keywords = ["Nifty 50 Index", "Flexi Cap", "Large & Mid Cap"]
         category_desc = "Moderate Risk / Equity"
     else: # high
-        keywords = ["Small Cap", "Mid Cap", "Momentum"]
+        risk_profile = "high"
         category_desc = "High Risk / Aggressive Equity"
 
-    search_term = random.choice(keywords)
-    
-    # 2. Call API
-    params = {"name": search_term}
-    headers = {"X-Api-Key": API_KEY}
-    
-    try:
-        response = requests.get(MF_BASE_URL, params=params, headers=headers)
-        
-        if response.status_code == 200:
-            data = response.json()
-            # Handle list vs dict response structure
-            funds = data if isinstance(data, list) else data.get("datasets", [])
-            
-            # Filter for funds that have a valid NAV
-            valid_funds = []
-            for f in funds:
-                name = f.get("schemeName") or f.get("fundName") or f.get("name")
-                nav = f.get("nav") or f.get("currentNav") or f.get("price")
-                
-                if name and nav:
-                    valid_funds.append({"name": name, "nav": float(nav)})
-            
-            if valid_funds:
-                selected = random.choice(valid_funds)
-                return {
-                    "name": selected["name"],
-                    "nav": selected["nav"],
-                    "category": category_desc
-                }
-                
-    except Exception as e:
-        print(f"MF API Error: {e}")
+    search_term = random.choice(mf_catalog.RISK_KEYWORDS[risk_profile])
+
+    # 2. Look up the catalog (the API is only searched if it has nothing for this keyword yet)
+    funds = mf_catalog.catalog.ensure_keyword(search_term)
+    if funds:
+        selected = random.choice(funds)
+        return {
+            "name": selected["name"],
+            "nav": selected["nav"],
+            "category": category_desc
+        }
 
     # Fallback if API fails
     return {
@@ -99,37 +108,107 @@ def get_mutual_fund_recommendation(risk_profile):
         "note": "Live NAV unavailable"
     }
 
+# --- FD/RD rate table ---
+
+class RateTable:
+    """
+    fd_rd_rates.csv parsed once into typed rows and reloaded when the file's
+    mtime changes.
+
+    Per Type, rows are grouped by Duration_Months (sorted) and, inside each
+    duration, sorted by Min_Investment with a running "best rate so far", so
+    the best option with Min_Investment <= amount is one bisect per duration.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.mtime = None
+        self.index = {}  # Type -> (durations, [(min_investments, best_row_so_far)])
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            self.mtime, self.index = None, {}
+            return
+        if mtime == self.mtime:
+            return
+        with self._lock:
+            if mtime == self.mtime:
+                return
+            try:
+                self.index = self.build(self.load())
+                self.mtime = mtime
+            except (OSError, ValueError, KeyError) as e:
+                print(f"CSV Error: {e}")  # Keep serving the previous table
+
+    def load(self):
+        with open(self.path, newline="") as f:
+            return [
+                {
+                    "Bank": row["Bank"],
+                    "Type": row["Type"],
+                    "Duration_Months": int(row["Duration_Months"]),
+                    "Interest_Rate": float(row["Interest_Rate"].strip().rstrip("%")),
+                    "Min_Investment": float(row["Min_Investment"]),
+                    "Risk_Rating": row["Risk_Rating"],
+                }
+                for row in csv.DictReader(f)
+            ]
+
+    @staticmethod
+    def build(rows):
+        buckets = {}
+        for row in rows:
+            buckets.setdefault(row["Type"], {}).setdefault(row["Duration_Months"], []).append(row)
+
+        index = {}
+        for type_, by_duration in buckets.items():
+            durations = sorted(by_duration)
+            entries = []
+            for duration in durations:
+                # Stable sort: on equal rates the row listed first in the file wins
+                bucket = sorted(by_duration[duration], key=lambda row: row["Min_Investment"])
+                best, best_so_far = None, []
+                for row in bucket:
+                    if best is None or row["Interest_Rate"] > best["Interest_Rate"]:
+                        best = row
+                    best_so_far.append(best)
+                entries.append(([row["Min_Investment"] for row in bucket], best_so_far))
+            index[type_] = (durations, entries)
+        return index
+
+    def best(self, type, amount, max_duration=None):
+        """
+        Highest-rate row of `type` with Min_Investment <= amount and
+        Duration_Months <= max_duration (any duration if None).
+        """
+        self.refresh()
+        durations, entries = self.index.get(type, ((), ()))
+        stop = len(durations) if max_duration is None else bisect.bisect_right(durations, max_duration)
+
+        best = None
+        for min_investments, best_so_far in entries[:stop]:
+            position = bisect.bisect_right(min_investments, amount)
+            if position and (best is None or best_so_far[position - 1]["Interest_Rate"] > best["Interest_Rate"]):
+                best = best_so_far[position - 1]
+        return best
+
+
+rate_table = RateTable(CSV_PATH)
+
 def get_best_rd_fd(amount, duration_years, type="RD"):
     """
-    Reads CSV and finds the best FD or RD based on interest rate and duration.
+    Finds the best FD or RD based on interest rate and duration.
     """
-    try:
-        if not os.path.exists(CSV_PATH):
-            return None
+    # We allow a small buffer in duration matching
+    best = rate_table.best(type, amount, duration_years * 12 + 12)
 
-        df = pd.read_csv(CSV_PATH)
-        duration_months = duration_years * 12
-        
-        # Filter by Type (FD/RD), Amount, and Duration
-        # We allow a small buffer in duration matching
-        valid_opts = df[
-            (df['Type'] == type) & 
-            (df['Min_Investment'] <= amount) & 
-            (df['Duration_Months'] <= duration_months + 12) 
-        ]
-        
-        # If strict matching fails, relax duration check just to get a bank name
-        if valid_opts.empty:
-            valid_opts = df[(df['Type'] == type) & (df['Min_Investment'] <= amount)]
-
-        if not valid_opts.empty:
-            # Sort by Interest Rate (Descending)
-            best_opt = valid_opts.sort_values(by='Interest_Rate', ascending=False).iloc[0]
-            return best_opt.to_dict()
-            
-    except Exception as e:
-        print(f"CSV Error: {e}")
-    return None
+    # If strict matching fails, relax duration check just to get a bank name
+    if best is None:
+        best = rate_table.best(type, amount)
+    return dict(best) if best else None
 
 def calculate_compound_growth(monthly_inv, rate, years):
     """
@@ -143,9 +222,129 @@ def calculate_compound_growth(monthly_inv, rate, years):
     fv = monthly_inv * ((((1 + r) ** months) - 1) / r) * (1 + r)
     return fv
 
-def generate_portfolio(user_profile, investable_amount, target_amount, time_horizon_years):
+def sip_growth_factor(rate, months):
+    """
+    Future value of investing 1 per month, the calculate_compound_growth
+    formula evaluated elementwise: `rate` (annual %) and `months` broadcast.
+    """
+    r = np.asarray(rate, dtype=np.float64) / 100 / 12
+    n = np.asarray(months, dtype=np.float64)
+    safe_r = np.where(r == 0, 1.0, r)
+    return np.where(r == 0, n, np.expm1(n * np.log1p(r)) / safe_r * (1 + r))
+
+def solve_goal(target_amount, rate, investable_amount=None, time_horizon_years=None,
+               amounts=None, horizons=None, rates=None):
+    """
+    Closed-form answers for a savings goal, no network calls:
+    - the monthly investment that reaches target_amount in time_horizon_years
+    - the months needed to reach it investing investable_amount monthly
+    plus the projected corpus over a grid of rates x horizons x amounts.
+    """
+    if investable_amount is None and time_horizon_years is None:
+        raise ValueError("Give investable_amount, time_horizon_years or both")
+    low_rate, high_rate = SOLVE_RATE_RANGE
+    for name, values, low, high in [
+        ("target_amount", [target_amount], 0, MAX_SOLVE_AMOUNT),
+        ("investable_amount", [] if investable_amount is None else [investable_amount], 0, MAX_SOLVE_AMOUNT),
+        ("amounts", amounts or [], 0, MAX_SOLVE_AMOUNT),
+        ("time_horizon_years", [] if time_horizon_years is None else [time_horizon_years], 0, MAX_SOLVE_YEARS),
+        ("horizons", horizons or [], 0, MAX_SOLVE_YEARS),
+    ]:
+        if not all(low < v <= high for v in values):
+            raise ValueError(f"{name} must be above {low} and at most {high:g}")
+    if not all(low_rate <= v <= high_rate for v in [rate] + list(rates or [])):
+        raise ValueError(f"Rates must be between {low_rate:g}% and {high_rate:g}%")
+
+    result = {"target_amount": target_amount, "rate": rate}
+    r = rate / 100 / 12
+
+    if time_horizon_years is not None:
+        factor = float(sip_growth_factor(rate, time_horizon_years * 12))
+        result["required_monthly_investment"] = round(target_amount / factor, 2)
+
+    if investable_amount is not None:
+        # Inverse of the SIP formula: (1 + r)^n = 1 + target * r / (P * (1 + r))
+        growth = target_amount * r / (investable_amount * (1 + r))
+        if r == 0:
+            months = target_amount / investable_amount
+        elif growth <= -1:
+            months = None # With a negative rate the corpus levels off below the target
+        else:
+            months = math.log1p(growth) / math.log1p(r)
+        if months is None or months > MAX_SOLVE_YEARS * 12:
+            result["required_months"] = result["required_years"] = None # Not reachable in MAX_SOLVE_YEARS
+        else:
+            months = math.ceil(months - 1e-9)
+            result["required_months"] = months
+            result["required_years"] = round(months / 12, 2)
+
+    # What-if grid, centred on the given (or solved) monthly amount
+    base_amount = investable_amount or result["required_monthly_investment"]
+    amounts = amounts or [round(base_amount * step, 2) for step in DEFAULT_GRID_AMOUNT_STEPS]
+    horizons = horizons or DEFAULT_GRID_HORIZONS
+    rates = rates or sorted(set(EXPECTED_RETURN_RATES.values()) | {rate})
+    if len(amounts) * len(horizons) * len(rates) > MAX_GRID_CELLS:
+        raise ValueError(f"Grid too large (max {MAX_GRID_CELLS} cells)")
+
+    # Shapes (rates, 1, 1) x (1, horizons, 1) x (1, 1, amounts)
+    factors = sip_growth_factor(np.asarray(rates)[:, None, None], np.asarray(horizons)[None, :, None] * 12)
+    corpus = factors * np.asarray(amounts, dtype=np.float64)[None, None, :]
+    result["grid"] = {
+        "rates": list(rates),
+        "horizons_years": list(horizons),
+        "amounts": list(amounts),
+        "projected_corpus": np.round(corpus, 2).tolist(), # [rate][horizon][amount]
+        "meets_target": (corpus >= target_amount).tolist(),
+    }
+    return result
+
+def simulate_goal(risk, rd_amt, rd_rate, mf_amt, stock_amt, target_amount, years, paths=MONTE_CARLO_PATHS):
+    """
+    Monte Carlo projection of the plan's corpus: the RD grows at its fixed
+    rate, the MF and direct equity sleeves follow correlated lognormal
+    monthly returns. Returns percentile bands and the share of paths that
+    reach target_amount.
+    """
+    months = int(years * 12)
+    if months <= 0:
+        corpus = np.zeros(1, dtype=np.float32)
+    else:
+        # Long horizons get fewer paths so the draws stay within budget;
+        # antithetic pairs (z, -z) keep the estimate tight at the same cost
+        half = max(1, min(paths, MONTE_CARLO_MAX_STEPS // months) // 2)
+        rng = np.random.default_rng(MONTE_CARLO_SEED)
+        market = rng.standard_normal((months, half), dtype=np.float32)
+        own = rng.standard_normal((months, half), dtype=np.float32)
+        market = np.concatenate([market, -market], axis=1)
+        own = np.concatenate([own, -own], axis=1)
+
+        # Monthly log returns with E[growth] = (1 + annual)^(1/12), shaped (months, sleeve, path)
+        assumptions = RETURN_ASSUMPTIONS.get(risk, RETURN_ASSUMPTIONS["medium"])
+        (mf_mean, mf_vol), (eq_mean, eq_vol) = assumptions["mf"], assumptions["equity"]
+        sigma = np.array([mf_vol, eq_vol], dtype=np.float32) / np.float32(math.sqrt(12))
+        mu = np.array([math.log1p(mf_mean), math.log1p(eq_mean)], dtype=np.float32) / 12 - sigma ** 2 / 2
+        z = np.stack([market, EQUITY_CORRELATION * market + math.sqrt(1 - EQUITY_CORRELATION ** 2) * own], axis=1)
+        growth = np.exp(mu[:, None] + sigma[:, None] * z)
+
+        # Same timing as calculate_compound_growth: invest, then grow for the month
+        contribution = np.array([[mf_amt], [stock_amt]], dtype=np.float32)
+        value = np.zeros(growth.shape[1:], dtype=np.float32)
+        for month_growth in growth:
+            value += contribution
+            value *= month_growth
+        corpus = value.sum(axis=0) + np.float32(calculate_compound_growth(rd_amt, rd_rate, years))
+
+    bands = np.percentile(corpus, PROJECTION_PERCENTILES)
+    return {
+        "paths": int(corpus.size),
+        "percentiles": {f"p{p}": round(float(v), 2) for p, v in zip(PROJECTION_PERCENTILES, bands)},
+        "probability_of_target": round(float(np.mean(corpus >= target_amount)), 4),
+    }
+
+def generate_portfolio(user_profile, investable_amount, target_amount, time_horizon_years, simulate=True):
     """
     Generates a lifecycle investment plan.
+    With `simulate`, the projection also carries a Monte Carlo range.
     """
     risk = user_profile.risk_tolerance.lower() # low, medium, high
     
@@ -163,19 +362,19 @@ def generate_portfolio(user_profile, investable_amount, target_amount, time_hori
     if risk == "low":
         rd_split = 0.70
         equity_split = 0.30
-        expected_return_rate = 7.5 # Conservative mix return
+        expected_return_rate = EXPECTED_RETURN_RATES["low"] # Conservative mix return
         stock_picks = ["ITC", "HUL", "SBIN"] # Defensive stocks
         
     elif risk == "medium":
         rd_split = 0.40
         equity_split = 0.60
-        expected_return_rate = 10.5 # Balanced mix return
+        expected_return_rate = EXPECTED_RETURN_RATES["medium"] # Balanced mix return
         stock_picks = ["RELIANCE", "INFY", "TCS", "LT"] # Bluechips
         
     else: # high
         rd_split = 0.20
         equity_split = 0.80
-        expected_return_rate = 14.0 # Aggressive mix return
+        expected_return_rate = EXPECTED_RETURN_RATES["high"] # Aggressive mix return
         stock_picks = ["ZOMATO", "ADANIENT", "TATASTEEL", "DLF"] # High Beta
 
     # --- 2. IMMEDIATE ACTION (Monthly Splits) ---
@@ -267,4 +466,10 @@ def generate_portfolio(user_profile, investable_amount, target_amount, time_hori
         "message": "You are on track to hit your goal!" if shortfall <= 0 else f"You might fall short by ₹{round(shortfall)}. Consider increasing investment or extending time."
     }
 
+    if simulate:
+        with metrics.timed("monte_carlo"):
+            plan["projection"]["monte_carlo"] = simulate_goal(
+                risk, rd_amt, rd_rate, mf_amt, stock_amt, target_amount, time_horizon_years
+            )
+
     return plan
\ No newline at end of file
@@ -0,0 +1,128 @@
+"""
+Small least-squares toolkit for the prediction model.
+
+The model has five features and a few hundred rows, so a QR solve in NumPy
+is far cheaper than importing and fitting sklearn's LinearRegression, and
+gives the same coefficients. RecursiveLeastSquares slides a training window
+one bar at a time in O(features^2) instead of refitting it from scratch.
+"""
+
+import numpy as np
+
+# Columns whose R diagonal falls below this (relative to the largest) are
+# treated as linearly dependent and solved with the minimum-norm fallback.
+RANK_TOLERANCE = 1e-10
+# Relative eigenvalue cutoff of the centered X'X in RecursiveLeastSquares
+# (the square of a 1e-6 singular value cutoff on X itself)
+RLS_RCOND = 1e-12
+
+
+class LinearModel:
+    """
+    Fitted y = X @ coef_ + intercept_, same attributes as sklearn's estimator.
+    """
+
+    def __init__(self, coef, intercept):
+        self.coef_ = coef
+        self.intercept_ = intercept
+
+    def predict(self, X):
+        return np.asarray(X, dtype=np.float64) @ self.coef_ + self.intercept_
+
+
+def fit_least_squares(X, y):
+    """
+    Ordinary least squares with intercept via QR on centered data.
+    Rank-deficient inputs (e.g. a constant Volatility column) fall back to
+    the minimum-norm solution, which is what sklearn returns as well.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    x_mean = X.mean(axis=0)
+    y_mean = y.mean()
+    Xc = X - x_mean
+    yc = y - y_mean
+
+    Q, R = np.linalg.qr(Xc)
+    diag = np.abs(np.diag(R))
+
+    # Fewer rows than features leaves R non-square: minimum-norm fallback too
+    if Xc.shape[0] >= Xc.shape[1] and len(diag) and diag.min() > RANK_TOLERANCE * max(diag.max(), 1.0):
+        coef = np.linalg.solve(R, Q.T @ yc)
+    else:
+        coef = np.linalg.lstsq(Xc, yc, rcond=None)[0]
+
+    return LinearModel(coef, y_mean - x_mean @ coef)
+
+
+class RecursiveLeastSquares:
+    """
+    Least squares with intercept over a sliding window of rows, for many
+    independent series (one per symbol) at once.
+
+    Keeps the sufficient statistics of the window -- row count, sums and
+    cross-products of X and y -- so adding a row or dropping the oldest one
+    is a rank-one update or downdate in O(features^2), instead of refitting
+    the whole window. The coefficients are solved from the centered
+    statistics on demand, the same minimum-norm solution fit_least_squares
+    gives on the window's rows.
+
+    `shift` (series, features), e.g. each series' mean, is subtracted from X
+    before accumulating so the centering does not cancel away precision.
+    """
+
+    def __init__(self, n_series, n_features, shift=None, shift_y=None):
+        self.shift = np.zeros((n_series, n_features)) if shift is None else shift
+        self.shift_y = np.zeros(n_series) if shift_y is None else shift_y
+        self.count = np.zeros(n_series)
+        self.sum_x = np.zeros((n_series, n_features))
+        self.sum_y = np.zeros(n_series)
+        self.xx = np.zeros((n_series, n_features, n_features))
+        self.xy = np.zeros((n_series, n_features))
+
+    def add(self, X, y, weights):
+        """
+        X: (series, rows, features), y and weights (0/1 row mask): (series, rows).
+        """
+        self._update(X, y, weights, 1.0)
+
+    def remove(self, X, y, weights):
+        """
+        Drops rows previously passed to add() with the same values.
+        """
+        self._update(X, y, weights, -1.0)
+
+    def _update(self, X, y, weights, sign):
+        if X.shape[1] == 0:
+            return
+        Xs = (X - self.shift[:, None, :]) * weights[..., None]
+        ys = (y - self.shift_y[:, None]) * weights
+        self.count += sign * weights.sum(axis=1)
+        self.sum_x += sign * Xs.sum(axis=1)
+        self.sum_y += sign * ys.sum(axis=1)
+        self.xx += sign * np.einsum("nrf,nrg->nfg", Xs, Xs)
+        self.xy += sign * np.einsum("nrf,nr->nf", Xs, ys)
+
+    def coefficients(self):
+        """
+        (coef (series, features), intercept (series,)) for the current
+        window; NaN for series with no rows. Columns are equilibrated before
+        the solve and directions with a relative eigenvalue below RLS_RCOND
+        (e.g. a feature that is a multiple of another) are dropped.
+        """
+        n = np.maximum(self.count, 1)[:, None]
+        mean_x = self.sum_x / n
+        mean_y = self.sum_y / n[:, 0]
+        cxx = self.xx - self.sum_x[:, :, None] * mean_x[:, None, :]
+        cxy = self.xy - self.sum_x * mean_y[:, None]
+
+        scale = np.sqrt(np.clip(np.einsum("nff->nf", cxx), 0.0, None))
+        scale[scale == 0] = 1.0
+        scaled = cxx / (scale[:, :, None] * scale[:, None, :])
+        coef = np.einsum("nfg,ng->nf", np.linalg.pinv(scaled, rcond=RLS_RCOND, hermitian=True), cxy / scale) / scale
+
+        intercept = self.shift_y + mean_y - np.einsum("nf,nf->n", self.shift + mean_x, coef)
+        empty = self.count <= 0
+        coef[empty], intercept[empty] = np.nan, np.nan
+        return coef, intercept
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field
+from typing import Annotated, List, Optional
 from datetime import datetime
 
 class UserBase(BaseModel):
@@ -12,6 +12,12 @@ class UserCreate(UserBase):
 class UserLogin(UserBase):
     password: str
 
+class UserUpdate(BaseModel):
+    full_name: Optional[str] = None
+    risk_tolerance: Optional[str] = None
+    monthly_income: Optional[float] = None
+    financial_goal: Optional[str] = None
+
 class UserOut(UserBase):
     id: int
     full_name: Optional[str] = None
@@ -30,7 +36,7 @@ class TransactionBase(BaseModel):
     note: Optional[str] = None
 
 class TransactionCreate(TransactionBase):
-    pass
+    date: Optional[datetime] = None # Defaults to now
 
 class TransactionOut(TransactionBase):
     id: int
@@ -38,6 +44,15 @@ class TransactionOut(TransactionBase):
     class Config:
         from_attributes = True
 
+class TransactionSummaryOut(BaseModel):
+    month: str # 'YYYY-MM'
+    category: str
+    type: str
+    total: float
+    count: int
+    class Config:
+        from_attributes = True
+
 class AssetBase(BaseModel):
     symbol: str
     quantity: float
@@ -61,8 +76,34 @@ class InvestmentRequest(BaseModel):
     risk_appetite: str  # "low", "medium", "high"
     target_amount: float # e.g., 500000 (5 Lakhs)
     time_horizon_years: int # e.g., 3 years
+    simulate: bool = True # Add a Monte Carlo range to the projection
+
+# Bounds keep the closed form finite (see recommendation_engine.solve_goal)
+SolveAmount = Annotated[float, Field(gt=0, le=1e12)]
+SolveYears = Annotated[float, Field(gt=0, le=100)]
+SolveRate = Annotated[float, Field(ge=-50, le=50)]   # Annual %, must stay above -100
+
+class GoalSolveRequest(BaseModel):
+    target_amount: SolveAmount
+    risk_appetite: str = "medium"          # Picks the expected return unless `rate` is given
+    rate: Optional[SolveRate] = None       # Expected annual return, %
+    investable_amount: Optional[SolveAmount] = None   # Given -> solve for the horizon
+    time_horizon_years: Optional[SolveYears] = None   # Given -> solve for the monthly amount
+    # What-if grid; defaults are derived from the answer
+    amounts: List[SolveAmount] = Field([], max_length=50)
+    horizons: List[SolveYears] = Field([], max_length=50)
+    rates: List[SolveRate] = Field([], max_length=20)
 
 class PredictionRequest(BaseModel):
     symbol: str
     period: str = "1yr"
 
+class BatchPredictionRequest(BaseModel):
+    symbols: List[str]
+    periods: List[str] = ["1yr"]
+
+class BacktestRequest(BaseModel):
+    symbols: List[str]
+    period: str = "1yr"     # Evaluation window
+    refit_every: int = Field(21, ge=1, le=252)   # Bars between walk-forward refits
+    horizon: int = Field(1, ge=1, le=20)         # Bars a trade may stay open
@@ -0,0 +1,123 @@
+"""
+/chat/stream against the fake provider (AI_PROVIDER=fake): no network,
+no API key, deterministic answers.
+"""
+import os
+import sys
+import json
+import tempfile
+
+_tmp = tempfile.mkdtemp()
+os.environ.update({
+    "AI_PROVIDER": "fake",
+    "AI_FAKE_RESPONSE": "Save more, spend less.",
+    "AI_FAKE_DELAY": "0",
+    "AI_CACHE_PATH": os.path.join(_tmp, "ai_cache.json"),
+    "AI_CACHE_FLUSH_DELAY": "3600",
+    "DATABASE_URL": f"sqlite:///{os.path.join(_tmp, 'test.db')}",
+    "INDIAN_API_KEY": "test",
+    "GOOGLE_API_KEY": "test",
+    "PRICE_REFRESH_ENABLED": "false",
+    "MF_CATALOG_REFRESH_ENABLED": "false",
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi.testclient import TestClient
+
+import ai
+import auth
+import main
+from database import get_async_db
+
+PROFILE = {"name": "Test", "income": 50000, "risk": "medium"}
+FINANCES = {"transactions": "No recent transactions.", "assets": "No assets."}
+
+
+async def fake_chat_context(db, user):
+    return PROFILE, FINANCES
+
+
+async def no_db():
+    yield None
+
+
+class FailingChain:
+    async def astream(self, inputs):
+        yield "Partial "
+        raise RuntimeError("model unavailable")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main, "build_chat_context", fake_chat_context)
+    main.app.dependency_overrides[auth.get_current_user] = lambda: None
+    main.app.dependency_overrides[get_async_db] = no_db
+    ai.response_cache.clear()
+    yield TestClient(main.app)
+    main.app.dependency_overrides.clear()
+    ai.response_cache.clear()
+
+
+def stream(client, question="How do I save?"):
+    """
+    POSTs to /chat/stream -> [(event, data)] in arrival order.
+    """
+    response = client.post("/chat/stream", json={"question": question})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = []
+    for block in response.text.split("\n\n"):
+        if not block:
+            continue
+        event, data = "message", None
+        for line in block.split("\n"):
+            field, _, value = line.partition(": ")
+            if field == "event":
+                event = value
+            elif field == "data":
+                data = json.loads(value)
+        events.append((event, data))
+    return events
+
+
+def test_miss_streams_tokens_then_done(client):
+    events = stream(client)
+
+    tokens = [data["token"] for event, data in events if event == "message"]
+    assert len(tokens) > 1  # The fake model streams one character at a time
+    assert "".join(tokens) == "Save more, spend less."
+    assert events[-1] == ("done", {})
+
+
+def test_hit_replays_cached_answer_as_one_chunk(client):
+    stream(client)
+    events = stream(client, question="how do I  save")  # Same question once normalized
+
+    assert events == [("message", {"token": "Save more, spend less."}), ("done", {})]
+
+
+def test_new_context_misses_the_cache(client, monkeypatch):
+    stream(client)
+
+    async def changed_context(db, user):
+        return PROFILE, {**FINANCES, "assets": "10 x INFY"}
+
+    monkeypatch.setattr(main, "build_chat_context", changed_context)
+    events = stream(client)
+    assert len([e for e in events if e[0] == "message"]) > 1
+
+
+def test_error_event_when_model_fails(client, monkeypatch):
+    monkeypatch.setattr(ai, "chain", FailingChain())
+    events = stream(client)
+
+    assert events[0] == ("message", {"token": "Partial "})
+    event, data = events[-1]
+    assert event == "error"
+    assert data["error"] == "model unavailable"
+    assert ("done", {}) not in events
+
+    # The cut-short answer is not cached
+    assert len(ai.response_cache) == 0
@@ -0,0 +1,213 @@
+"""
+Bulk import of transactions from an uploaded CSV or bank statement.
+
+The file is read row by row and inserted in batches of IMPORT_BATCH_SIZE,
+one commit per batch (rows + summary rollup together), so memory stays
+flat however long the statement is. On Postgres each batch goes through
+COPY; elsewhere it is a single executemany INSERT.
+
+Two layouts are understood (auto-detected from the header):
+- csv:       amount, category, type, [note], [date]
+- statement: Date, Description/Narration, Debit/Withdrawal, Credit/Deposit,
+             [Category]  -- the usual bank export; debits become expenses
+"""
+import io
+import os
+import csv
+import codecs
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from pydantic import ValidationError
+from sqlalchemy import insert
+import models, schemas, crud
+from database import SessionLocal
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "2000"))
+MAX_REPORTED_ERRORS = 50
+
+DATE_FORMATS = ["%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%d/%m/%Y", "%d-%m-%Y", "%d-%b-%Y", "%d %b %Y", "%d/%m/%y"]
+
+STATEMENT_COLUMNS = {
+    "date": ["date", "txn date", "transaction date", "value date"],
+    "description": ["description", "narration", "particulars", "details", "remarks"],
+    "debit": ["debit", "withdrawal", "withdrawal amt.", "withdrawal amount", "debit amount"],
+    "credit": ["credit", "deposit", "deposit amt.", "deposit amount", "credit amount"],
+    "category": ["category"],
+}
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+# --- Parsing ---
+
+def parse_date(value):
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised date '{value}'")
+
+def parse_amount(value):
+    # Bank exports use thousands separators and sometimes a currency sign
+    value = (value or "").replace(",", "").replace("₹", "").strip()
+    return float(value) if value else 0.0
+
+def find_column(header, names):
+    for name in names:
+        if name in header:
+            return header[name]
+    return None
+
+def detect_format(fieldnames):
+    header = {name.strip().lower() for name in fieldnames or []}
+    if {"amount", "category", "type"} <= header:
+        return "csv"
+    if header & set(STATEMENT_COLUMNS["debit"] + STATEMENT_COLUMNS["credit"]):
+        return "statement"
+    raise ImportFormatError("Unrecognised header: expected amount/category/type or a bank statement layout")
+
+def read_rows(stream, fmt="auto"):
+    """
+    Yields (line_number, raw dict in TransactionCreate shape) lazily.
+    `stream` is a binary file object; it is decoded on the fly.
+    """
+    text = codecs.getreader("utf-8-sig")(stream, errors="replace")
+    reader = csv.DictReader(text)
+    if fmt == "auto":
+        fmt = detect_format(reader.fieldnames)
+
+    header = {name.strip().lower(): name for name in reader.fieldnames or []}
+    if fmt == "statement":
+        columns = {key: find_column(header, names) for key, names in STATEMENT_COLUMNS.items()}
+
+    for row in reader:
+        line = reader.line_num
+        if not any((v or "").strip() for v in row.values()):
+            continue
+
+        if fmt == "csv":
+            get = lambda key: row.get(header.get(key, key))
+            yield line, {
+                "amount": get("amount"),
+                "category": get("category"),
+                "type": (get("type") or "").strip().lower(),
+                "note": get("note") or None,
+                "date": get("date") or None,
+            }
+        else:
+            debit = parse_amount(row.get(columns["debit"])) if columns["debit"] else 0.0
+            credit = parse_amount(row.get(columns["credit"])) if columns["credit"] else 0.0
+            category = (row.get(columns["category"]) or "").strip() if columns["category"] else ""
+            description = (row.get(columns["description"]) or "").strip() if columns["description"] else ""
+            yield line, {
+                "amount": debit or credit,
+                "category": category or "Uncategorized",
+                "type": "expense" if debit else "income",
+                "note": description or None,
+                "date": row.get(columns["date"]) if columns["date"] else None,
+            }
+
+def validate(raw):
+    """
+    Returns a schemas.TransactionCreate, raising ValueError on bad rows.
+    """
+    if isinstance(raw["date"], str):
+        raw["date"] = parse_date(raw["date"])
+    if isinstance(raw["amount"], str):
+        raw["amount"] = parse_amount(raw["amount"])
+    try:
+        transaction = schemas.TransactionCreate(**raw)
+    except ValidationError as e:
+        raise ValueError("; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+    if transaction.type not in ("income", "expense"):
+        raise ValueError("type must be 'income' or 'expense'")
+    if not transaction.amount:
+        raise ValueError("amount is zero")
+    return transaction
+
+
+# --- Writing ---
+
+COLUMNS = ["amount", "category", "type", "note", "date", "user_id"]
+
+def copy_batch(db, rows):
+    """
+    Postgres: stream the batch through COPY ... FROM STDIN.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        # None is written as an empty unquoted field, which COPY reads as NULL
+        writer.writerow([row[column].isoformat() if column == "date" else row[column] for column in COLUMNS])
+    buffer.seek(0)
+
+    raw = db.connection().connection  # psycopg2 connection, same DB transaction
+    with raw.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {models.Transaction.__tablename__} ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+
+def write_batch(db, rows):
+    if db.get_bind().dialect.name == "postgresql":
+        copy_batch(db, rows)
+    else:
+        db.execute(insert(models.Transaction), rows)
+
+    crud.add_to_summary(db, *[SimpleNamespace(**row) for row in rows])
+    db.commit()
+
+def import_transactions(stream, user_id, fmt="auto"):
+    """
+    Imports every valid row of the file for `user_id`.
+    Invalid rows are skipped and reported (up to MAX_REPORTED_ERRORS).
+    If the import fails part-way, batches already committed are kept.
+    Runs blocking I/O: call it from a worker thread.
+    """
+    imported, skipped, errors = 0, 0, []
+    now = datetime.now(timezone.utc)
+    batch = []
+
+    db = SessionLocal()
+    try:
+        for line, raw in read_rows(stream, fmt):
+            try:
+                transaction = validate(raw)
+            except ValueError as e:
+                skipped += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"line": line, "error": str(e)})
+                continue
+
+            row = transaction.dict()
+            date = row["date"] or now
+            # Statement dates without a zone are taken as UTC
+            row["date"] = date.replace(tzinfo=timezone.utc) if date.tzinfo is None else date.astimezone(timezone.utc)
+            row["user_id"] = user_id
+            batch.append(row)
+
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                write_batch(db, batch)
+                imported += len(batch)
+                batch = []
+
+        if batch:
+            write_batch(db, batch)
+            imported += len(batch)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    return {"imported": imported, "skipped": skipped, "errors": errors}
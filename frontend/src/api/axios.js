@@ -18,4 +18,18 @@ api.interceptors.request.use((config) => {
     return config;
 });
 
-export default api;
\ No newline at end of file
+export default api;
+// POST for streaming endpoints (Server-Sent Events). axios buffers the whole
+// body, so this uses fetch and hands back the Response to read incrementally.
+export const postStream = (path, body) => {
+    const token = localStorage.getItem('token');
+    return fetch(`${baseURL}${path}`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            Accept: 'text/event-stream',
+            ...(token ? { Authorization: `Bearer ${token}` } : {}),
+        },
+        body: JSON.stringify(body),
+    });
+};
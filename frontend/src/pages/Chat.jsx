@@ -1,7 +1,24 @@
 import { useState, useRef, useEffect } from "react";
 import { motion, AnimatePresence } from "framer-motion";
 import { Send, Bot, User, Sparkles, MessageSquare, AlertCircle } from "lucide-react";
-import api from "../api/axios"; // This automatically adds your Token
+import { postStream } from "../api/axios"; // This automatically adds your Token
+
+// Splits a Server-Sent Events buffer into complete events.
+// Returns [events, leftover text of an event still arriving].
+const parseEvents = (buffer) => {
+    const blocks = buffer.split("\n\n");
+    const rest = blocks.pop();
+    const events = blocks.filter(Boolean).map((block) => {
+        let event = "message";
+        let data = "";
+        for (const line of block.split("\n")) {
+            if (line.startsWith("event:")) event = line.slice(6).trim();
+            else if (line.startsWith("data:")) data += line.slice(5).trim();
+        }
+        return { event, data: data ? JSON.parse(data) : {} };
+    });
+    return [events, rest];
+};
 
 const Chat = () => {
     // Initial welcome message
@@ -37,31 +54,59 @@ const Chat = () => {
         setInput(""); // Clear input
         setLoading(true);
 
+        const botId = Date.now() + 1;
+        // The bot bubble appears with the first token and grows as more arrive
+        const appendToken = (token) => {
+            setLoading(false);
+            setMessages(prev => prev.some(m => m.id === botId)
+                ? prev.map(m => m.id === botId ? { ...m, text: m.text + token } : m)
+                : [...prev, { id: botId, text: token, sender: "bot" }]);
+        };
+        const showError = (text) => {
+            setMessages(prev => [...prev, { id: Date.now() + 2, text, sender: "bot", isError: true }]);
+        };
+
         try {
-            // 2. CALL YOUR REAL BACKEND
-            // Your backend expects: request.question
-            const response = await api.post("/chat", { 
-                question: questionText 
+            // 2. STREAM FROM YOUR REAL BACKEND
+            // Your backend expects: request.question, and sends
+            // data: {"token": ...} events, then "done" (or "error")
+            const response = await postStream("/chat/stream", {
+                question: questionText
             });
+            if (!response.ok) {
+                const body = await response.json().catch(() => ({}));
+                showError(typeof body.detail === "string" ? body.detail : "Failed to connect to AI server.");
+                return;
+            }
 
-            // 3. Add Bot Response to UI
-            // Your backend returns: {"response": ai_response}
-            const botText = response.data.response;
-            
-            const botMsg = { id: Date.now() + 1, text: botText, sender: "bot" };
-            setMessages(prev => [...prev, botMsg]);
+            // 3. Add tokens to the bot message as they arrive
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = "";
+            let finished = false;
+            while (!finished) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+
+                const [events, rest] = parseEvents(buffer);
+                buffer = rest;
+                for (const { event, data } of events) {
+                    if (event === "message" && data.token) {
+                        appendToken(data.token);
+                    } else if (event === "error") {
+                        showError(data.message || "Failed to connect to AI server.");
+                        finished = true;
+                    } else if (event === "done") {
+                        finished = true;
+                    }
+                }
+            }
+            if (finished) reader.cancel();
 
         } catch (error) {
             console.error("Chat Error:", error);
-            const errorMessage = error.response?.data?.detail || "Failed to connect to AI server.";
-            
-            const errorMsg = { 
-                id: Date.now() + 1, 
-                text: errorMessage, 
-                sender: "bot", 
-                isError: true 
-            };
-            setMessages(prev => [...prev, errorMsg]);
+            showError("Failed to connect to AI server.");
         } finally {
             setLoading(false);
         }